@@ -5,7 +5,7 @@
 import pymysql
 from pymysql import cursors
 from queue import Queue, Empty
-from threading import Lock
+from threading import Condition, Lock
 import time
 from typing import Dict
 import logging
@@ -31,6 +31,7 @@ class ConnectionPool:
         self._pool = Queue(maxsize=max_size)
         self._active_connections = 0
         self._lock = Lock()
+        self._available = Condition(self._lock)
 
         # 初始化连接池
         self._initialize_pool()
@@ -72,36 +73,32 @@ class ConnectionPool:
         Raises:
             TimeoutError: 获取连接超时
         """
-        with self._lock:
-            if not self._pool.empty():
+        # _active_connections 为已借出的连接数，池中空闲连接另计
+        deadline = time.monotonic() + timeout
+        with self._available:
+            while True:
                 try:
-                    conn = self._pool.get(timeout=1)
+                    conn = self._pool.get_nowait()
                     self._active_connections += 1
                     return conn
                 except Empty:
                     pass
 
-            # 如果没有可用连接但可以创建新连接
-            if self._active_connections < self.max_size:
-                try:
-                    conn = self._create_connection()
-                    self._active_connections += 1
-                    return conn
-                except Exception as e:
-                    logger.error(f"创建新连接失败: {e}")
-                    raise ConnectionError(f"无法创建数据库连接: {e}")
-
-            # 等待连接释放
-            start_time = time.time()
-            while time.time() - start_time < timeout:
-                try:
-                    conn = self._pool.get(timeout=0.1)
-                    self._active_connections += 1
-                    return conn
-                except Empty:
-                    continue
+                # 如果没有可用连接但可以创建新连接
+                if self._active_connections + self._pool.qsize() < self.max_size:
+                    try:
+                        conn = self._create_connection()
+                        self._active_connections += 1
+                        return conn
+                    except Exception as e:
+                        logger.error(f"创建新连接失败: {e}")
+                        raise ConnectionError(f"无法创建数据库连接: {e}")
 
-            raise TimeoutError("获取数据库连接超时")
+                # 等待连接释放（wait期间释放锁，其他线程才能归还连接）
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError("获取数据库连接超时")
+                self._available.wait(remaining)
 
     def return_connection(self, conn: pymysql.Connection) -> None:
         """
@@ -110,24 +107,28 @@ class ConnectionPool:
         Args:
             conn: 数据库连接
         """
-        with self._lock:
-            if conn.open:
+        # 连接检查和重建在锁外进行，不阻塞其他线程借还
+        if conn.open:
+            try:
+                # 检查连接是否仍然有效
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+            except Exception:
+                # 连接已失效，创建新的代替
                 try:
-                    # 检查连接是否仍然有效
-                    with conn.cursor() as cursor:
-                        cursor.execute("SELECT 1")
-                except Exception:
-                    # 连接已失效，创建新的代替
-                    try:
-                        conn = self._create_connection()
-                    except Exception as e:
-                        logger.error(f"创建替换连接失败: {e}")
-                        self._active_connections -= 1
-                        return
-
+                    conn = self._create_connection()
+                except Exception as e:
+                    logger.error(f"创建替换连接失败: {e}")
+                    conn = None
+        else:
+            conn = None
+
+        with self._available:
+            self._active_connections -= 1
+            if conn is not None:
                 self._pool.put(conn)
-            else:
-                self._active_connections -= 1
+            # 无论归还还是丢弃，都让出了一个名额
+            self._available.notify()
 
     def close_all(self) -> None:
         """关闭所有连接"""
@@ -140,8 +141,6 @@ class ConnectionPool:
                 except Empty:
                     break
 
-            self._active_connections = 0
-
     def stats(self) -> Dict:
         """获取连接池统计信息"""
         with self._lock:
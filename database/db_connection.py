@@ -4,8 +4,10 @@
 """
 
 import pymysql
+from pymysql.constants import CLIENT, FIELD_TYPE
+from pymysql.converters import conversions
 import logging
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Union
 import os
 
 # 设置日志
@@ -14,15 +16,25 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 
+# DECIMAL列直接解码为float，省去调用方逐行转换
+_FLOAT_DECIMAL_CONV = dict(conversions)
+_FLOAT_DECIMAL_CONV[FIELD_TYPE.DECIMAL] = float
+_FLOAT_DECIMAL_CONV[FIELD_TYPE.NEWDECIMAL] = float
+
+
 class BaseConnection:
     """数据库连接基类"""
 
-    def __init__(self, config_file: str = None):
+    # 服务器参数在运行期间不变，整个进程只查询一次
+    _server_vars: Optional[Dict[str, Any]] = None
+
+    def __init__(self, config_file: str = None, pooled: bool = False):
         """
         初始化数据库连接
 
         Args:
             config_file: 配置文件路径
+            pooled: 是否从全局连接池借用连接（close时归还而非断开）
         """
         # 设置日志
         self.logger = logging.getLogger(self.__class__.__name__)
@@ -42,6 +54,8 @@ class BaseConnection:
             self._load_config(config_file)
 
         self.connection = None
+        self.pooled = pooled
+        self._pool = None
 
     def _load_config(self, config_file: str):
         """从配置文件加载配置"""
@@ -63,8 +77,18 @@ class BaseConnection:
         except Exception as e:
             self.logger.warning(f"加载配置文件失败: {e}")
 
-    def connect(self) -> bool:
-        """连接数据库"""
+    def connect(self, multi_statements: bool = False, decimal_as_float: bool = False) -> bool:
+        """
+        连接数据库
+
+        Args:
+            multi_statements: 是否允许一次发送多条语句（execute_multi 需要）
+            decimal_as_float: 是否将DECIMAL列直接返回为float（用于统计/绘图）
+        """
+        # 池中连接按默认参数创建，需要特殊连接参数时单独建立连接
+        if self.pooled and not multi_statements and not decimal_as_float:
+            return self._lease()
+
         try:
             self.connection = pymysql.connect(
                 host=self.config['host'],
@@ -73,7 +97,9 @@ class BaseConnection:
                 password=self.config['password'],
                 database=self.config['database'],
                 charset=self.config['charset'],
-                cursorclass=pymysql.cursors.DictCursor
+                cursorclass=pymysql.cursors.DictCursor,
+                client_flag=CLIENT.MULTI_STATEMENTS if multi_statements else 0,
+                conv=_FLOAT_DECIMAL_CONV if decimal_as_float else None
             )
 
             self.logger.info("数据库连接成功")
@@ -84,9 +110,34 @@ class BaseConnection:
             self.connection = None
             return False
 
+    def _lease(self) -> bool:
+        """从全局连接池借用连接"""
+        try:
+            from database.connection_pool import get_connection_pool
+            from database.db_config import DatabaseConfig
+
+            self._pool = get_connection_pool(DatabaseConfig(**self.config))
+            self.connection = self._pool.get_connection()
+            return True
+
+        except Exception as e:
+            self.logger.error(f"从连接池获取连接失败: {e}")
+            self._pool = None
+            self.connection = None
+            return False
+
     def close(self):
-        """关闭数据库连接"""
-        if self.connection:
+        """关闭数据库连接（借用的连接归还连接池）"""
+        if self.connection and self._pool:
+            try:
+                # 丢弃未提交的修改，避免带入下一个借用者
+                self.connection.rollback()
+            except pymysql.Error:
+                pass
+            self._pool.return_connection(self.connection)
+            self._pool = None
+            self.connection = None
+        elif self.connection:
             self.connection.close()
             self.logger.info("数据库连接已关闭")
             self.connection = None
@@ -153,6 +204,56 @@ class BaseConnection:
                 self.connection.rollback()
             return False
 
+    def execute_multi(self, sqls: Union[str, List[str]]) -> Optional[List[List[Dict]]]:
+        """
+        在一次往返中执行多条查询
+
+        连接需以 connect(multi_statements=True) 建立。
+
+        Args:
+            sqls: SQL语句列表（不带参数），或已用分号拼接好的语句文本
+
+        Returns:
+            与 sqls 一一对应的结果集列表，出错时返回None
+        """
+        if not self.connection:
+            self.logger.error("数据库未连接")
+            return None
+
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute(sqls if isinstance(sqls, str) else ";\n".join(sqls))
+
+                results = [list(cursor.fetchall())]
+                while cursor.nextset():
+                    results.append(list(cursor.fetchall()))
+
+                return results
+
+        except pymysql.Error as e:
+            self.logger.error(f"批量查询时发生错误: {e}")
+            return None
+
+    def get_server_vars(self) -> Optional[Dict[str, Any]]:
+        """
+        获取服务器参数（max_allowed_packet、wait_timeout、net_buffer_length）
+
+        首次调用时查询并缓存在类上，之后所有实例直接复用。
+
+        Returns:
+            参数名到值的字典，查询失败时返回None
+        """
+        if BaseConnection._server_vars is None:
+            row = self.execute(
+                "SELECT @@max_allowed_packet AS max_allowed_packet, "
+                "@@wait_timeout AS wait_timeout, "
+                "@@net_buffer_length AS net_buffer_length",
+                fetch_one=True
+            )
+            if row:
+                BaseConnection._server_vars = {key: int(value) for key, value in row.items()}
+        return BaseConnection._server_vars
+
     def get_cursor(self):
         """获取游标"""
         if not self.connection:
@@ -48,6 +48,8 @@ CREATE TABLE `medical_images` (
   KEY `idx_category_id` (`category_id`),
   KEY `idx_upload_time` (`upload_time`),
   KEY `idx_is_deleted` (`is_deleted`),
+  KEY `idx_mi_patient_deleted_time` (`patient_id`,`is_deleted`,`upload_time` DESC),
+  KEY `idx_mi_deleted_time` (`is_deleted`,`upload_time` DESC),
   CONSTRAINT `medical_images_ibfk_1` FOREIGN KEY (`category_id`) REFERENCES `image_categories` (`category_id`) ON DELETE SET NULL,
   CONSTRAINT `medical_images_ibfk_2` FOREIGN KEY (`patient_id`) REFERENCES `patients` (`patient_id`) ON DELETE CASCADE,
   CONSTRAINT `medical_images_ibfk_3` FOREIGN KEY (`visit_id`) REFERENCES `medical_visits` (`visit_id`) ON DELETE CASCADE,
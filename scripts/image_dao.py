@@ -4,27 +4,152 @@
 处理图片的CRUD操作
 """
 
-import uuid
+import os
+import secrets
+import shutil
+import stat
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from typing import List, Dict, Any, Optional, Tuple, BinaryIO
 from pathlib import Path
 from PIL import Image as PILImage
 
+try:
+    # 可选：只读取文件头获取图片尺寸
+    import imagesize
+except ImportError:
+    imagesize = None
+
+try:
+    # 可选：libvips的SIMD重采样和按比例解码能显著加快缩略图生成
+    import pyvips
+except (ImportError, OSError):
+    pyvips = None
+
 from database.db_connection import BaseConnection
 
 
+# 分页查询依赖的组合索引：WHERE 列在前、ORDER BY 列在后，
+# 使 MySQL 可以按索引顺序扫描而不必 filesort
+_IMAGE_INDEXES = {
+    # get_patient_images: WHERE patient_id = ? AND is_deleted = 0 ORDER BY upload_time DESC
+    'idx_mi_patient_deleted_time': "(patient_id, is_deleted, upload_time DESC)",
+    # search_images: WHERE is_deleted = 0 [AND ...] ORDER BY upload_time DESC
+    'idx_mi_deleted_time': "(is_deleted, upload_time DESC)",
+}
+
+# 图片结果中补充的名称字段：字段名 -> (外键列, 维表, 主键列, 名称列)
+_NAME_LOOKUPS = {
+    'category_name': ('category_id', 'image_categories', 'category_id', 'category_name'),
+    'patient_name': ('patient_id', 'patients', 'patient_id', 'name'),
+    'doctor_name': ('doctor_id', 'doctors', 'doctor_id', 'name'),
+    'uploader_name': ('uploaded_by', 'users', 'user_id', 'username'),
+}
+
+# 图片分类表很少变化，进程内缓存一段时间（秒）
+_CATEGORY_TTL = 60
+_CATEGORY_CACHE: Dict[str, Any] = {'ts': 0.0, 'data': None}
+
+# search_images 的可选过滤条件：(条件名, WHERE片段, 是否激活)
+_SEARCH_FILTERS = [
+    ('patient_id', "mi.patient_id = %s", bool),
+    ('category_id', "mi.category_id = %s", bool),
+    ('doctor_id', "mi.doctor_id = %s", bool),
+    ('visit_id', "mi.visit_id = %s", bool),
+    ('keyword', """(mi.title LIKE %s OR mi.description LIKE %s OR mi.tags LIKE %s 
+                 OR mi.original_filename LIKE %s)""", bool),
+    ('start_date', "mi.upload_time >= %s", bool),
+    ('end_date', "mi.upload_time <= %s", bool),
+    ('is_public', "mi.is_public = %s", lambda value: value is not None),
+]
+_SEARCH_CLAUSES = {name: clause for name, clause, _ in _SEARCH_FILTERS}
+
+# 按过滤条件组合缓存的 (查询SQL, 计数SQL)，相同组合复用同一SQL文本
+_SEARCH_TEMPLATES: Dict[Tuple[str, ...], Tuple[str, str]] = {}
+
+
+_INSERT_IMAGE_SQL = """
+INSERT INTO medical_images (
+    original_filename, stored_filename, file_path, file_size, mime_type,
+    image_width, image_height, category_id, patient_id, visit_id, doctor_id,
+    title, description, tags, is_public, uploaded_by
+) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+
+def _image_insert_params(image_data: Dict[str, Any], stored_filename: str, file_path: str,
+                         file_size: int, image_width: int, image_height: int) -> Tuple:
+    """按 _INSERT_IMAGE_SQL 的列顺序构建插入参数"""
+    return (
+        image_data.get('original_filename', ''),
+        stored_filename,
+        file_path,
+        file_size,
+        image_data.get('mime_type', ''),
+        image_width,
+        image_height,
+        image_data.get('category_id'),
+        image_data.get('patient_id'),
+        image_data.get('visit_id'),
+        image_data.get('doctor_id'),
+        image_data.get('title', ''),
+        image_data.get('description', ''),
+        image_data.get('tags', ''),
+        image_data.get('is_public', False),
+        image_data.get('uploaded_by')
+    )
+
+
+def _build_search_templates(active: Tuple[str, ...]) -> Tuple[str, str]:
+    """为一组激活的过滤条件生成搜索SQL和计数SQL"""
+    conditions = ["mi.is_deleted = 0"] + [_SEARCH_CLAUSES[name] for name in active]
+    where_clause = " AND ".join(conditions)
+
+    sql = f"""
+    SELECT mi.*
+    FROM medical_images mi
+    WHERE {where_clause}
+    ORDER BY mi.upload_time DESC
+    LIMIT %s OFFSET %s
+    """
+
+    count_sql = f"""
+    SELECT COUNT(*) as total 
+    FROM medical_images mi
+    WHERE {where_clause}
+    """
+
+    return sql, count_sql
+
+
+def invalidate_category_cache():
+    """使分类缓存失效（在 image_categories 写入后调用）"""
+    _CATEGORY_CACHE.update(ts=0.0, data=None)
+
+
 class ImageDAO:
-    """图片数据访问对象"""
+    """
+    图片数据访问对象
+
+    单次调用时每个方法自行建立并关闭连接；批量操作时可使用
+    ``with ImageDAO() as dao:`` 让块内所有调用复用同一个连接。
+    """
 
-    def __init__(self, base_storage_path: str = "medical_images"):
+    def __init__(self, base_storage_path: str = "medical_images", pooled: bool = False):
         """
         初始化ImageDAO
 
         Args:
             base_storage_path: 图片存储基础路径
+            pooled: 是否从全局连接池借用连接
         """
-        self.db = BaseConnection()
+        self.db = BaseConnection(pooled=pooled)
         self.base_storage_path = Path(base_storage_path)
 
+        # 连接引用计数，嵌套调用和with块共享同一连接
+        self._conn_refs = 0
+
         # 创建存储目录
         self.original_dir = self.base_storage_path / "originals"
         self.thumbnails_dir = self.base_storage_path / "thumbnails"
@@ -33,6 +158,44 @@ class ImageDAO:
         for directory in [self.original_dir, self.thumbnails_dir, self.temp_dir]:
             directory.mkdir(parents=True, exist_ok=True)
 
+    def __enter__(self) -> 'ImageDAO':
+        self._acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._release()
+
+    def _acquire(self):
+        """获取连接：仅在没有活动连接时才真正连接数据库"""
+        self._conn_refs += 1
+        if not self.db.connection:
+            self.db.connect()
+
+    def _release(self):
+        """释放连接：最外层调用结束时才关闭连接"""
+        self._conn_refs = max(self._conn_refs - 1, 0)
+        if self._conn_refs == 0:
+            self.db.close()
+
+    @contextmanager
+    def bulk_insert(self):
+        """
+        批量导入上下文
+
+        块内所有调用复用同一连接，外键检查只在进入时关闭一次、退出时恢复，
+        而不是每插入一张图片切换一次。
+        """
+        self._acquire()
+        try:
+            self.get_cursor().execute("SET FOREIGN_KEY_CHECKS = 0")
+            yield self
+        finally:
+            try:
+                if self.db.connection:
+                    self.get_cursor().execute("SET FOREIGN_KEY_CHECKS = 1")
+            finally:
+                self._release()
+
     def _generate_filename(self, original_filename: str) -> Tuple[str, str]:
         """
         生成存储文件名
@@ -45,7 +208,7 @@ class ImageDAO:
         """
         # 生成唯一文件名
         file_extension = Path(original_filename).suffix.lower()
-        unique_id = uuid.uuid4().hex
+        unique_id = secrets.token_hex(16)
         stored_filename = f"{unique_id}{file_extension}"
 
         return stored_filename, file_extension
@@ -67,16 +230,53 @@ class ImageDAO:
         # 构建保存路径
         save_path = self.original_dir / stored_filename
 
-        # 保存文件
-        file_stream.seek(0)
-        file_content = file_stream.read()
-        file_size = len(file_content)
-
         with open(save_path, 'wb') as f:
-            f.write(file_content)
+            # 源为普通磁盘文件时由内核直接复制，数据不经过用户态；
+            # 与流式复制一样总是从文件开头复制
+            source = self._sendfile_source(file_stream)
+            if source is not None:
+                src_fd, end = source
+                offset = 0
+                try:
+                    while offset < end:
+                        sent = os.sendfile(f.fileno(), src_fd, offset, end - offset)
+                        if sent == 0:
+                            break
+                        offset += sent
+                    return stored_filename, offset
+                except OSError:
+                    # 文件系统不支持时回退到流式复制
+                    f.seek(0)
+                    f.truncate()
+
+            if file_stream.seekable():
+                file_stream.seek(0)
+
+            # 分块流式写入，避免整个文件读入内存（管道、套接字等不可定位的流直接顺序读取）
+            shutil.copyfileobj(file_stream, f, length=1024 * 1024)
+            file_size = f.tell()
 
         return stored_filename, file_size
 
+    @staticmethod
+    def _sendfile_source(file_stream: BinaryIO) -> Optional[Tuple[int, int]]:
+        """
+        返回可用于 os.sendfile 的 (源文件描述符, 文件大小)
+
+        仅普通文件可用：内存流没有描述符，管道、套接字、标准输入的 st_size 为0，
+        这些情况返回None，由调用方回退到流式复制
+        """
+        if not hasattr(os, 'sendfile'):
+            return None
+        try:
+            src_fd = file_stream.fileno()
+            st = os.fstat(src_fd)
+        except (AttributeError, OSError, ValueError):
+            return None
+        if not stat.S_ISREG(st.st_mode):
+            return None
+        return src_fd, st.st_size
+
     def create_thumbnail(self, image_path: Path, size: Tuple[int, int],
                          quality: int = 85) -> Tuple[Path, Tuple[int, int], int]:
         """
@@ -90,9 +290,28 @@ class ImageDAO:
         Returns:
             (thumbnail_path, (width, height), file_size)
         """
+        # 生成缩略图文件名
+        thumbnail_filename = f"{image_path.stem}_{size[0]}x{size[1]}.jpg"
+        thumbnail_path = self.thumbnails_dir / thumbnail_filename
+
+        # Huffman优化需要两遍编码，只对小尺寸缩略图启用
+        optimize = size[0] < 300 and size[1] < 300
+
         try:
+            if pyvips is not None:
+                # libvips解码时直接按比例缩小，且不会放大小图
+                thumb = pyvips.Image.thumbnail(str(image_path), size[0],
+                                               height=size[1], size='down')
+                thumb.jpegsave(str(thumbnail_path), Q=quality, optimize_coding=optimize)
+                return thumbnail_path, (thumb.width, thumb.height), thumbnail_path.stat().st_size
+
             # 打开原始图片
             with PILImage.open(image_path) as img:
+                # 已是RGB且不大于目标尺寸时，无需转换和重采样，直接编码
+                if img.mode == 'RGB' and img.size[0] <= size[0] and img.size[1] <= size[1]:
+                    img.save(thumbnail_path, 'JPEG', quality=quality, optimize=optimize)
+                    return thumbnail_path, img.size, thumbnail_path.stat().st_size
+
                 # 转换为RGB模式（如果是RGBA）
                 if img.mode in ('RGBA', 'LA', 'P'):
                     img = img.convert('RGB')
@@ -100,12 +319,8 @@ class ImageDAO:
                 # 计算缩略图尺寸
                 img.thumbnail(size, PILImage.Resampling.LANCZOS)
 
-                # 生成缩略图文件名
-                thumbnail_filename = f"{image_path.stem}_{size[0]}x{size[1]}.jpg"
-                thumbnail_path = self.thumbnails_dir / thumbnail_filename
-
                 # 保存缩略图
-                img.save(thumbnail_path, 'JPEG', quality=quality, optimize=True)
+                img.save(thumbnail_path, 'JPEG', quality=quality, optimize=optimize)
 
                 # 获取文件大小
                 file_size = thumbnail_path.stat().st_size
@@ -115,10 +330,114 @@ class ImageDAO:
         except Exception as e:
             raise Exception(f"创建缩略图失败: {e}")
 
+    def ensure_indexes(self) -> List[str]:
+        """
+        确保 medical_images 上存在分页查询所需的组合索引（可重复执行）
+
+        MySQL 不支持 CREATE INDEX IF NOT EXISTS，因此先查询
+        INFORMATION_SCHEMA.STATISTICS，只创建缺失的索引。
+
+        Returns:
+            本次新建的索引名列表
+        """
+        try:
+            self._acquire()
+
+            sql = """
+            SELECT DISTINCT INDEX_NAME
+            FROM INFORMATION_SCHEMA.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'medical_images'
+            """
+            existing = {row['INDEX_NAME'] for row in self.db.execute(sql, fetch_all=True) or []}
+
+            created = []
+            cursor = self.get_cursor()
+            for index_name, columns in _IMAGE_INDEXES.items():
+                if index_name not in existing:
+                    cursor.execute(f"CREATE INDEX {index_name} ON medical_images {columns}")
+                    created.append(index_name)
+
+            return created
+
+        except Exception as e:
+            raise Exception(f"创建索引失败: {e}")
+        finally:
+            self._release()
+
+    @staticmethod
+    def _probe_dimensions(file_path: str) -> Tuple[int, int]:
+        """
+        获取图片尺寸
+
+        优先用imagesize只解析文件头（JPEG SOF / PNG IHDR / GIF 屏幕描述符），
+        无法识别的格式再回退到Pillow。
+
+        Returns:
+            (width, height)，无法识别时为 (0, 0)
+        """
+        if imagesize is not None:
+            try:
+                width, height = imagesize.get(file_path)
+                if width > 0 and height > 0:
+                    return width, height
+            except Exception:
+                pass
+
+        try:
+            with PILImage.open(file_path) as img:
+                return img.size
+        except Exception:
+            return 0, 0
+
     def get_cursor(self):
         """获取数据库游标"""
         return self.db.connection.cursor()
 
+    def _attach_names(self, rows: List[Dict], fields: Tuple[str, ...]) -> List[Dict]:
+        """
+        为图片结果补充关联名称字段
+
+        代替逐行LEFT JOIN：每个维表只按 IN (...) 批量查询一次，
+        分类名称优先取自 get_categories 的进程内缓存。
+        """
+        if not rows:
+            return rows
+
+        for field in fields:
+            fk, table, pk, column = _NAME_LOOKUPS[field]
+            ids = {row[fk] for row in rows if row.get(fk) is not None}
+
+            names = {}
+            if field == 'category_name':
+                names = {cat['category_id']: cat['category_name']
+                         for cat in self.get_categories() or []}
+
+            missing = sorted(ids - names.keys())
+            if missing:
+                placeholders = ", ".join(["%s"] * len(missing))
+                sql = f"SELECT {pk} as id, {column} as name FROM {table} WHERE {pk} IN ({placeholders})"
+                for row in self.db.execute(sql, missing, fetch_all=True) or []:
+                    names[row['id']] = row['name']
+
+            for row in rows:
+                row[field] = names.get(row.get(fk))
+
+        return rows
+
+    def _page_total(self, results: List[Dict], offset: int, page_size: int,
+                    count_sql: str, count_params) -> int:
+        """
+        计算分页查询的总数
+
+        未满一页的非空结果（或第一页）即为最后一页，总数可直接推出；
+        否则单独执行 COUNT(*)，分页查询本身保持按索引顺序扫描、LIMIT 后即停止
+        """
+        if len(results) < page_size and (results or offset == 0):
+            return offset + len(results)
+
+        count_result = self.db.execute(count_sql, count_params, fetch_one=True)
+        return count_result.get('total', 0) if count_result else 0
+
     def add_image(self, image_data: Dict[str, Any], file_stream: BinaryIO = None) -> int:
         """
         添加新图片
@@ -131,11 +450,8 @@ class ImageDAO:
             图片ID
         """
         try:
-            self.db.connect()
-
-            # 临时禁用外键检查
+            self._acquire()
             cursor = self.get_cursor()
-            cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
 
             # 获取文件信息
             original_filename = image_data.get('original_filename', '')
@@ -162,65 +478,31 @@ class ImageDAO:
             image_height = image_data.get('image_height')
 
             if not image_width or not image_height:
-                try:
-                    with PILImage.open(file_path) as img:
-                        image_width, image_height = img.size
-                except:
-                    image_width = image_height = 0
+                image_width, image_height = self._probe_dimensions(file_path)
 
-            # 构建SQL
-            sql = """
-            INSERT INTO medical_images (
-                original_filename, stored_filename, file_path, file_size, mime_type,
-                image_width, image_height, category_id, patient_id, visit_id, doctor_id,
-                title, description, tags, is_public, uploaded_by
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """
+            params = _image_insert_params(image_data, stored_filename, file_path,
+                                          file_size, image_width, image_height)
 
-            params = (
-                original_filename,
-                stored_filename,
-                file_path,
-                file_size,
-                mime_type,
-                image_width,
-                image_height,
-                image_data.get('category_id'),
-                image_data.get('patient_id'),
-                image_data.get('visit_id'),
-                image_data.get('doctor_id'),
-                image_data.get('title', ''),
-                image_data.get('description', ''),
-                image_data.get('tags', ''),
-                image_data.get('is_public', False),
-                image_data.get('uploaded_by')
-            )
-
-            # 执行插入
-            cursor = self.get_cursor()
-            cursor.execute(sql, params)
+            # 执行插入，使用同一游标读取lastrowid
+            cursor.execute(_INSERT_IMAGE_SQL, params)
             image_id = cursor.lastrowid
 
             # 创建缩略图
             if image_id and file_path:
                 self.create_image_thumbnails(image_id, Path(file_path))
 
-            # 在提交前重新启用外键
-            cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
             self.db.connection.commit()  # 修正：通过db.connection访问
             return image_id
 
         except Exception as e:
-            if hasattr(self.db, 'connection') and self.db.connection:
+            if getattr(self.db, 'connection', None):
                 try:
-                    cursor = self.get_cursor()
-                    cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
                     self.db.connection.rollback()
                 except:
                     pass
             raise Exception(f"添加图片失败: {e}")
         finally:
-            self.db.close()
+            self._release()
 
     def create_image_thumbnails(self, image_id: int, image_path: Path):
         """为图片创建缩略图"""
@@ -232,29 +514,30 @@ class ImageDAO:
                 'large': (600, 600)
             }
 
+            rows = []
             for size_name, size in thumbnail_sizes.items():
                 thumbnail_path, (width, height), file_size = self.create_thumbnail(
                     image_path, size
                 )
 
-                # 保存缩略图信息到数据库
-                sql = """
-                INSERT INTO image_thumbnails 
-                (image_id, thumbnail_size, thumbnail_path, width, height, file_size)
-                VALUES (%s, %s, %s, %s, %s, %s)
-                """
-
-                params = (
+                rows.append((
                     image_id,
                     size_name,
                     str(thumbnail_path),
                     width,
                     height,
                     file_size
-                )
+                ))
+
+            # 批量保存缩略图信息到数据库
+            sql = """
+            INSERT INTO image_thumbnails 
+            (image_id, thumbnail_size, thumbnail_path, width, height, file_size)
+            VALUES (%s, %s, %s, %s, %s, %s)
+            """
 
-                cursor = self.get_cursor()
-                cursor.execute(sql, params)
+            cursor = self.get_cursor()
+            cursor.executemany(sql, rows)
 
         except Exception as e:
             print(f"创建缩略图失败: {e}")
@@ -262,8 +545,9 @@ class ImageDAO:
     def get_image_by_id(self, image_id: int) -> Optional[Dict]:
         """根据ID获取图片信息"""
         try:
-            self.db.connect()
+            self._acquire()
 
+            # 单行主键查询直接JOIN，一次往返取回全部名称；批量补名称只用于列表查询
             sql = """
             SELECT 
                 mi.*,
@@ -285,32 +569,27 @@ class ImageDAO:
         except Exception as e:
             raise Exception(f"获取图片失败: {e}")
         finally:
-            self.db.close()
+            self._release()
 
     def get_patient_images(self, patient_id: int, page: int = 1,
                            page_size: int = 20) -> Tuple[List[Dict], int]:
         """获取患者的图片"""
         try:
-            self.db.connect()
+            self._acquire()
 
             # 计算偏移量
             offset = (page - 1) * page_size
 
             # 查询图片列表
             sql = """
-            SELECT 
-                mi.*,
-                ic.category_name,
-                d.name as doctor_name
+            SELECT mi.*
             FROM medical_images mi
-            LEFT JOIN image_categories ic ON mi.category_id = ic.category_id
-            LEFT JOIN doctors d ON mi.doctor_id = d.doctor_id
             WHERE mi.patient_id = %s AND mi.is_deleted = 0
             ORDER BY mi.upload_time DESC
             LIMIT %s OFFSET %s
             """
 
-            results = self.db.execute(sql, (patient_id, page_size, offset), fetch_all=True)
+            results = self.db.execute(sql, (patient_id, page_size, offset), fetch_all=True) or []
 
             # 查询总数
             count_sql = """
@@ -318,20 +597,20 @@ class ImageDAO:
             FROM medical_images 
             WHERE patient_id = %s AND is_deleted = 0
             """
-            count_result = self.db.execute(count_sql, (patient_id,), fetch_one=True)
-            total = count_result.get('total', 0) if count_result else 0
+            total = self._page_total(results, offset, page_size, count_sql, (patient_id,))
+            self._attach_names(results, ('category_name', 'doctor_name'))
 
             return results, total
 
         except Exception as e:
             raise Exception(f"获取患者图片失败: {e}")
         finally:
-            self.db.close()
+            self._release()
 
     def get_visit_images(self, visit_id: int) -> List[Dict]:
         """获取就诊记录的图片"""
         try:
-            self.db.connect()
+            self._acquire()
 
             sql = """
             SELECT 
@@ -349,12 +628,13 @@ class ImageDAO:
         except Exception as e:
             raise Exception(f"获取就诊图片失败: {e}")
         finally:
-            self.db.close()
+            self._release()
 
     def update_image_info(self, image_id: int, update_data: Dict[str, Any]) -> bool:
         """更新图片信息"""
         try:
-            self.db.connect()
+            self._acquire()
+            cursor = self.get_cursor()
 
             # 构建更新语句
             set_clauses = []
@@ -377,29 +657,30 @@ class ImageDAO:
             WHERE image_id = %s AND is_deleted = 0
             """
 
-            cursor = self.get_cursor()
-            affected_rows = cursor.execute(sql, params)
+            cursor.execute(sql, params)
+            affected_rows = cursor.rowcount
 
             self.db.connection.commit()  # 修正：通过db.connection访问
             return affected_rows > 0
 
         except Exception as e:
-            if hasattr(self.db, 'connection') and self.db.connection:
+            if getattr(self.db, 'connection', None):
                 self.db.connection.rollback()
             raise Exception(f"更新图片信息失败: {e}")
         finally:
-            self.db.close()
+            self._release()
 
     def delete_image(self, image_id: int, soft_delete: bool = True) -> bool:
         """删除图片"""
         try:
-            self.db.connect()
+            self._acquire()
+            cursor = self.get_cursor()
 
             if soft_delete:
                 # 软删除：标记为已删除
                 sql = "UPDATE medical_images SET is_deleted = 1 WHERE image_id = %s"
-                cursor = self.get_cursor()
-                affected_rows = cursor.execute(sql, (image_id,))
+                cursor.execute(sql, (image_id,))
+                affected_rows = cursor.rowcount
             else:
                 # 硬删除：从数据库和文件系统中删除
                 # 先获取图片信息
@@ -407,146 +688,180 @@ class ImageDAO:
                 if not image_info:
                     return False
 
-                # 删除数据库记录
+                # 缩略图记录会随主记录级联删除，需在删除前取出路径
+                sql = "SELECT thumbnail_path FROM image_thumbnails WHERE image_id = %s FOR UPDATE"
+                cursor.execute(sql, (image_id,))
+                thumbnail_paths = [row['thumbnail_path'] for row in cursor.fetchall()]
+
+                # 删除数据库记录（image_thumbnails 通过外键 ON DELETE CASCADE 一并删除）
                 sql = "DELETE FROM medical_images WHERE image_id = %s"
-                cursor = self.get_cursor()
-                affected_rows = cursor.execute(sql, (image_id,))
+                cursor.execute(sql, (image_id,))
+                affected_rows = cursor.rowcount
 
                 # 删除文件
                 if affected_rows > 0:
-                    self._delete_image_files(image_info)
+                    self._delete_image_files(image_info, thumbnail_paths)
 
             self.db.connection.commit()  # 修正：通过db.connection访问
             return affected_rows > 0
 
         except Exception as e:
-            if hasattr(self.db, 'connection') and self.db.connection:
+            if getattr(self.db, 'connection', None):
                 self.db.connection.rollback()
             raise Exception(f"删除图片失败: {e}")
         finally:
-            self.db.close()
-
-    def _delete_image_files(self, image_info: Dict):
-        """删除图片文件"""
-        try:
-            # 删除原始文件
-            original_path = Path(image_info.get('file_path', ''))
-            if original_path.exists():
-                original_path.unlink()
+            self._release()
 
-            # 删除缩略图
-            sql = "SELECT thumbnail_path FROM image_thumbnails WHERE image_id = %s"
-            thumbnails = self.db.execute(sql, (image_info['image_id'],), fetch_all=True)
+    def _delete_image_files(self, image_info: Dict, thumbnail_paths: List[str]):
+        """删除原图和缩略图文件"""
+        paths = [image_info.get('file_path', '')] + list(thumbnail_paths)
+        paths = [Path(path) for path in paths if path]
 
-            for thumb in thumbnails:
-                thumb_path = Path(thumb.get('thumbnail_path', ''))
-                if thumb_path.exists():
-                    thumb_path.unlink()
-
-            # 删除缩略图记录
-            delete_sql = "DELETE FROM image_thumbnails WHERE image_id = %s"
-            self.db.execute(delete_sql, (image_info['image_id'],))
+        try:
+            # unlink 系统调用期间会释放GIL，多线程并行删除
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                list(executor.map(lambda path: path.unlink(missing_ok=True), paths))
 
         except Exception as e:
             print(f"删除文件失败: {e}")
 
     def get_categories(self) -> List[Dict]:
-        """获取所有图片分类"""
+        """获取所有图片分类（进程内缓存 _CATEGORY_TTL 秒）"""
+        now = time.monotonic()
+        if _CATEGORY_CACHE['data'] is not None and now - _CATEGORY_CACHE['ts'] < _CATEGORY_TTL:
+            return _CATEGORY_CACHE['data']
+
         try:
-            self.db.connect()
+            self._acquire()
 
             sql = "SELECT * FROM image_categories ORDER BY category_name"
             results = self.db.execute(sql, fetch_all=True)
+            if results is not None:
+                _CATEGORY_CACHE.update(ts=now, data=results)
             return results
 
         except Exception as e:
             raise Exception(f"获取分类失败: {e}")
         finally:
-            self.db.close()
+            self._release()
 
     def search_images(self, search_criteria: Dict, page: int = 1,
                       page_size: int = 20) -> Tuple[List[Dict], int]:
         """搜索图片"""
         try:
-            self.db.connect()
-
-            # 构建查询条件
-            conditions = ["mi.is_deleted = 0"]
+            self._acquire()
+
+            # 按激活的过滤条件取出（或首次生成）SQL模板
+            active = tuple(name for name, _, is_active in _SEARCH_FILTERS
+                           if is_active(search_criteria.get(name)))
+            templates = _SEARCH_TEMPLATES.get(active)
+            if templates is None:
+                templates = _build_search_templates(active)
+                _SEARCH_TEMPLATES[active] = templates
+            sql, count_sql = templates
+
+            # 按模板中的占位符顺序绑定参数
             params = []
+            for name in active:
+                value = search_criteria[name]
+                if name == 'keyword':
+                    keyword = f"%{value}%"
+                    params.extend([keyword, keyword, keyword, keyword])
+                else:
+                    params.append(value)
 
-            if search_criteria.get('patient_id'):
-                conditions.append("mi.patient_id = %s")
-                params.append(search_criteria['patient_id'])
-
-            if search_criteria.get('category_id'):
-                conditions.append("mi.category_id = %s")
-                params.append(search_criteria['category_id'])
+            # 计算偏移量
+            offset = (page - 1) * page_size
 
-            if search_criteria.get('doctor_id'):
-                conditions.append("mi.doctor_id = %s")
-                params.append(search_criteria['doctor_id'])
+            count_params = list(params)
+            params.extend([page_size, offset])
+            results = self.db.execute(sql, params, fetch_all=True) or []
+            total = self._page_total(results, offset, page_size, count_sql, count_params)
+            self._attach_names(results, ('category_name', 'patient_name', 'doctor_name'))
 
-            if search_criteria.get('visit_id'):
-                conditions.append("mi.visit_id = %s")
-                params.append(search_criteria['visit_id'])
+            return results, total
 
-            if search_criteria.get('keyword'):
-                keyword = f"%{search_criteria['keyword']}%"
-                conditions.append("""
-                (mi.title LIKE %s OR mi.description LIKE %s OR mi.tags LIKE %s 
-                 OR mi.original_filename LIKE %s)
-                """)
-                params.extend([keyword, keyword, keyword, keyword])
+        except Exception as e:
+            raise Exception(f"搜索图片失败: {e}")
+        finally:
+            self._release()
 
-            if search_criteria.get('start_date'):
-                conditions.append("mi.upload_time >= %s")
-                params.append(search_criteria['start_date'])
 
-            if search_criteria.get('end_date'):
-                conditions.append("mi.upload_time <= %s")
-                params.append(search_criteria['end_date'])
+class BulkImageWriter:
+    """
+    medical_images 批量写入器
 
-            if search_criteria.get('is_public') is not None:
-                conditions.append("mi.is_public = %s")
-                params.append(search_criteria['is_public'])
+    用于批量导入已保存到磁盘的图片记录：参数在内存中缓冲，
+    每满 flush_size 行用一次 executemany 写入并提交，不生成缩略图。
 
-            # 计算偏移量
-            offset = (page - 1) * page_size
+    用法:
+        with BulkImageWriter(ImageDAO()) as writer:
+            for image_data in images:
+                writer.add(image_data)
+    """
 
-            # 查询数据
-            where_clause = " AND ".join(conditions) if conditions else "1=1"
+    def __init__(self, dao: ImageDAO, flush_size: int = 1000):
+        """
+        初始化批量写入器
 
-            sql = f"""
-            SELECT 
-                mi.*,
-                ic.category_name,
-                p.name as patient_name,
-                d.name as doctor_name
-            FROM medical_images mi
-            LEFT JOIN image_categories ic ON mi.category_id = ic.category_id
-            LEFT JOIN patients p ON mi.patient_id = p.patient_id
-            LEFT JOIN doctors d ON mi.doctor_id = d.doctor_id
-            WHERE {where_clause}
-            ORDER BY mi.upload_time DESC
-            LIMIT %s OFFSET %s
-            """
+        Args:
+            dao: 提供数据库连接的ImageDAO
+            flush_size: 缓冲行数达到该值时自动写入
+        """
+        self.dao = dao
+        self.flush_size = flush_size
+        self.buffer: List[Tuple] = []
+        self.written = 0
 
-            params.extend([page_size, offset])
-            results = self.db.execute(sql, params, fetch_all=True)
+    def __enter__(self) -> 'BulkImageWriter':
+        self.dao._acquire()
+        return self
 
-            # 查询总数
-            count_sql = f"""
-            SELECT COUNT(*) as total 
-            FROM medical_images mi
-            WHERE {where_clause}
-            """
-            count_params = params[:-2]  # 移除LIMIT和OFFSET参数
-            count_result = self.db.execute(count_sql, count_params, fetch_one=True)
-            total = count_result.get('total', 0) if count_result else 0
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            if exc_type is None:
+                self.flush()
+        finally:
+            self.dao._release()
 
-            return results, total
+    def add(self, image_data: Dict[str, Any]):
+        """
+        添加一条图片记录
 
+        Args:
+            image_data: 图片信息字典，需包含 stored_filename、file_path、
+                        original_filename 和 mime_type
+        """
+        if not image_data.get('stored_filename') or not image_data.get('file_path'):
+            raise ValueError("文件信息不完整")
+
+        self.buffer.append(_image_insert_params(
+            image_data,
+            image_data['stored_filename'],
+            image_data['file_path'],
+            image_data.get('file_size', 0),
+            image_data.get('image_width'),
+            image_data.get('image_height')
+        ))
+
+        if len(self.buffer) >= self.flush_size:
+            self.flush()
+
+    def flush(self) -> int:
+        """写入并提交缓冲区中的记录，返回写入行数"""
+        if not self.buffer:
+            return 0
+
+        connection = self.dao.db.connection
+        try:
+            with connection.cursor() as cursor:
+                cursor.executemany(_INSERT_IMAGE_SQL, self.buffer)
+            connection.commit()
         except Exception as e:
-            raise Exception(f"搜索图片失败: {e}")
-        finally:
-            self.db.close()
\ No newline at end of file
+            connection.rollback()
+            raise Exception(f"批量写入图片失败: {e}")
+
+        count = len(self.buffer)
+        self.written += count
+        self.buffer = []
+        return count
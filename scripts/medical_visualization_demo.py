@@ -5,25 +5,119 @@
 
 import sys
 import os
+import io
+import json
+import hashlib
+import argparse
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from database.db_connection import BaseConnection
-from visualization import MedicalQueryVisualizer
+from visualization import MedicalQueryVisualizer, rows_to_columns
+
+# 查询结果磁盘缓存目录
+_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache')
+
+# 演示用查询，在 run_simple_demos 中合并为一次往返执行
+_SQL_DOCTOR_RANK = """
+        SELECT 
+            d.name as doctor_name,
+            dept.dept_name,
+            COUNT(mv.visit_id) as visit_count,
+            COALESCE(SUM(mv.total_fee), 0) as total_revenue
+        FROM doctors d
+        JOIN departments dept ON d.department_id = dept.department_id
+        LEFT JOIN medical_visits mv ON d.doctor_id = mv.doctor_id
+        GROUP BY d.doctor_id, d.name, dept.dept_name
+        HAVING COUNT(mv.visit_id) > 0
+        ORDER BY visit_count DESC
+        LIMIT 10
+        """
+
+_SQL_DEPT_STATS = """
+        SELECT 
+            dept.dept_name,
+            COUNT(mv.visit_id) as visit_count,
+            COALESCE(SUM(mv.total_fee), 0) as total_revenue
+        FROM departments dept
+        LEFT JOIN doctors d ON dept.department_id = d.department_id
+        LEFT JOIN medical_visits mv ON d.doctor_id = mv.doctor_id
+        WHERE mv.visit_date IS NOT NULL
+        GROUP BY dept.department_id, dept.dept_name
+        HAVING COUNT(mv.visit_id) > 0
+        ORDER BY total_revenue DESC
+        LIMIT 8
+        """
+
+# 环比增长率由窗口函数直接算出，首月为0；月份以整数 YYYYMM 分组，在Python中格式化
+_SQL_MONTHLY = """
+        SELECT 
+            ym,
+            visit_count,
+            monthly_revenue,
+            COALESCE(ROUND((visit_count - LAG(visit_count) OVER w) * 100.0
+                           / NULLIF(LAG(visit_count) OVER w, 0), 2), 0) as visit_growth_percent,
+            COALESCE(ROUND((monthly_revenue - LAG(monthly_revenue) OVER w) * 100.0
+                           / NULLIF(LAG(monthly_revenue) OVER w, 0), 2), 0) as revenue_growth_percent
+        FROM (
+            SELECT 
+                YEAR(visit_date) * 100 + MONTH(visit_date) as ym,
+                COUNT(*) as visit_count,
+                COALESCE(SUM(total_fee), 0) as monthly_revenue
+            FROM medical_visits
+            WHERE visit_date >= DATE_SUB(CURDATE(), INTERVAL 12 MONTH)  # 改为12个月
+            GROUP BY ym
+        ) monthly
+        WINDOW w AS (ORDER BY ym)
+        ORDER BY ym
+        """
+
+
+# 批量查询文本与其摘要在导入时生成一次，缓存键只需再拼接日期
+_DEMO_BATCH_SQL = ";\n".join((_SQL_DOCTOR_RANK, _SQL_DEPT_STATS, _SQL_MONTHLY))
+_DEMO_BATCH_DIGEST = hashlib.sha1(_DEMO_BATCH_SQL.encode('utf-8'))
+
+
+def _mock_months(last_count, last_revenue, n):
+    """
+    以最后一个月为基准，按每月±10%随机波动生成n个月的模拟数据
+
+    Returns:
+        (就诊次数数组, 收入数组)
+    """
+    counts = np.maximum(1, (last_count * np.cumprod(np.random.uniform(0.9, 1.1, n))).astype(np.int64))
+    revenues = np.maximum(10.0, last_revenue * np.cumprod(np.random.uniform(0.9, 1.1, n)))
+    return counts, revenues
+
+
+def _growth_percent(values, prev_value):
+    """计算相对上一个月的增长率(%)，上月为0时记0"""
+    prev = np.concatenate(([prev_value], values[:-1])).astype(np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth = np.where(prev > 0, (values - prev) * 100.0 / prev, 0.0)
+    return np.round(growth, 2)
 
 
 class SimpleMedicalVisualization:
     """简化版医疗数据可视化"""
 
-    def __init__(self):
+    def __init__(self, use_cache: bool = True):
+        """
+        Args:
+            use_cache: 是否使用当天的查询结果磁盘缓存
+        """
         self.db = BaseConnection()
         self.visualizer = MedicalQueryVisualizer()
+        self.use_cache = use_cache
 
     def run_simple_demos(self):
         """运行简化版可视化演示"""
         try:
-            self.db.connect()
-
             print("=" * 60)
             print("简化版医疗数据库查询可视化演示")
             print("=" * 60)
@@ -31,14 +125,9 @@ class SimpleMedicalVisualization:
             # 1. 基础柱状图演示
             self.demo_basic_bar_chart()
 
-            # 2. 医生排名可视化
-            self.demo_doctor_ranking_simple()
-
-            # 3. 科室统计可视化
-            self.demo_department_statistics_simple()
-
-            # 4. 月度趋势可视化
-            self.demo_monthly_trend_simple()
+            # 2~4. 医生排名、科室统计、月度趋势：查询合并为一次往返
+            for spec, results in zip(DEMOS, self._fetch_demo_data()):
+                self._run_demo(spec, results)
 
             print("\n" + "=" * 60)
             print("✅ 所有可视化演示完成！")
@@ -48,8 +137,48 @@ class SimpleMedicalVisualization:
         except Exception as e:
             print(f"❌ 演示出错: {e}")
         finally:
+            self.visualizer.close()
             self.db.close()
 
+    def _fetch_demo_data(self):
+        """
+        一次往返获取医生排名、科室统计和月度趋势数据
+
+        Returns:
+            (医生排名, 科室统计, 月度数据)，查询失败时对应项为None
+        """
+        # 缓存键包含UTC日期，每天自动失效
+        digest = _DEMO_BATCH_DIGEST.copy()
+        digest.update(datetime.now(timezone.utc).strftime('%Y-%m-%d').encode('utf-8'))
+        key = digest.hexdigest()
+        cache_file = os.path.join(_CACHE_DIR, f"{key}.json")
+
+        if self.use_cache and os.path.exists(cache_file):
+            try:
+                with open(cache_file, 'r', encoding='utf-8') as f:
+                    results = json.load(f)
+                print("📦 使用缓存的查询结果")
+                return tuple(results)
+            except (OSError, ValueError) as e:
+                print(f"⚠️  读取缓存失败: {e}")
+
+        if not self.db.is_connected():
+            self.db.connect(multi_statements=True, decimal_as_float=True)
+
+        results = self.db.execute_multi(_DEMO_BATCH_SQL)
+        if results is None or len(results) != 3:
+            return None, None, None
+
+        if self.use_cache:
+            try:
+                os.makedirs(_CACHE_DIR, exist_ok=True)
+                with open(cache_file, 'w', encoding='utf-8') as f:
+                    json.dump(results, f, ensure_ascii=False, default=str)
+            except OSError as e:
+                print(f"⚠️  写入缓存失败: {e}")
+
+        return tuple(results)
+
     def demo_basic_bar_chart(self):
         """基础柱状图演示"""
         print("\n1. 基础柱状图演示")
@@ -73,214 +202,79 @@ class SimpleMedicalVisualization:
 
         print("✅ 基础柱状图已生成")
 
-    def demo_doctor_ranking_simple(self):
-        """简化版医生排名可视化"""
-        print("\n2. 医生排名可视化")
-        print("-" * 40)
-
-        sql = """
-        SELECT 
-            d.name as doctor_name,
-            dept.dept_name,
-            COUNT(mv.visit_id) as visit_count,
-            COALESCE(SUM(mv.total_fee), 0) as total_revenue
-        FROM doctors d
-        JOIN departments dept ON d.department_id = dept.department_id
-        LEFT JOIN medical_visits mv ON d.doctor_id = mv.doctor_id
-        GROUP BY d.doctor_id, d.name, dept.dept_name
-        HAVING COUNT(mv.visit_id) > 0
-        ORDER BY visit_count DESC
-        LIMIT 10
+    def _run_demo(self, spec, results):
         """
+        按演示规格显示查询结果并生成图表
 
-        try:
-            results = self.db.execute(sql, fetch_all=True)
-            if results:
-                print(f"✅ 获取到 {len(results)} 位医生的数据")
-
-                # 显示数据
-                print("\n📊 医生排名数据:")
-                for i, row in enumerate(results, 1):
-                    print(f"  {i}. {row.get('doctor_name', '未知')} ({row.get('dept_name', '未知')})")
-                    print(f"     就诊: {row.get('visit_count', 0)}次")
-                    print(f"     收入: ¥{row.get('total_revenue', 0):.2f}")
-
-                # 生成可视化图表
-                self.visualizer.visualize_doctor_ranking(
-                    results,
-                    title="医生就诊量和收入排名Top 10",
-                    top_n=10
-                )
-
-                print("✅ 医生排名图表已生成")
-            else:
-                print("📭 暂无医生数据")
-
-        except Exception as e:
-            print(f"❌ 查询失败: {e}")
-
-    def demo_department_statistics_simple(self):
-        """简化版科室统计可视化"""
-        print("\n3. 科室统计可视化")
-        print("-" * 40)
-
-        sql = """
-        SELECT 
-            dept.dept_name,
-            COUNT(mv.visit_id) as visit_count,
-            COALESCE(SUM(mv.total_fee), 0) as total_revenue
-        FROM departments dept
-        LEFT JOIN doctors d ON dept.department_id = d.department_id
-        LEFT JOIN medical_visits mv ON d.doctor_id = mv.doctor_id
-        WHERE mv.visit_date IS NOT NULL
-        GROUP BY dept.department_id, dept.dept_name
-        HAVING COUNT(mv.visit_id) > 0
-        ORDER BY total_revenue DESC
-        LIMIT 8
+        Args:
+            spec: 演示规格（DemoSpec）
+            results: 查询结果，None表示查询失败
         """
+        print(f"\n{spec.heading}")
+        print("-" * 40)
 
         try:
-            results = self.db.execute(sql, fetch_all=True)
+            if results is None:
+                raise RuntimeError(f"{spec.name}查询失败")
             if results:
-                print(f"✅ 获取到 {len(results)} 个科室的数据")
+                print(f"✅ 获取到 {len(results)} {spec.count_label}的数据")
 
-                # 显示数据
-                print("\n📊 科室统计数据:")
-                for i, row in enumerate(results, 1):
-                    dept_name = row.get('dept_name', '未知科室')
-                    visit_count = row.get('visit_count', 0)
-                    total_revenue = row.get('total_revenue', 0)
-
-                    # 将decimal转换为float用于显示
-                    try:
-                        revenue_float = float(total_revenue)
-                    except (TypeError, ValueError):
-                        revenue_float = 0.0
-
-                    print(f"  {i}. {dept_name}")
-                    print(f"     就诊: {visit_count}次")
-                    print(f"     收入: ¥{revenue_float:.2f}")
-
-                    # 更新row中的revenue为float类型
-                    row['total_revenue'] = revenue_float
-
-                # 生成可视化图表
-                self.visualizer.visualize_department_statistics(
-                    results,
-                    title="科室就诊统计"
-                )
-
-                print("✅ 科室统计图表已生成")
-            else:
-                print("📭 暂无科室数据")
-
-        except Exception as e:
-            print(f"❌ 查询失败: {e}")
-
-    def demo_monthly_trend_simple(self):
-        """简化版月度趋势可视化 - 修复版"""
-        print("\n4. 月度趋势可视化")
-        print("-" * 40)
-
-        # 修改SQL查询，增加时间范围并确保有数据
-        sql = """
-        SELECT 
-            DATE_FORMAT(visit_date, '%Y-%m') as month,
-            COUNT(*) as visit_count,
-            COALESCE(SUM(total_fee), 0) as monthly_revenue
-        FROM medical_visits
-        WHERE visit_date >= DATE_SUB(CURDATE(), INTERVAL 12 MONTH)  # 改为12个月
-        GROUP BY DATE_FORMAT(visit_date, '%Y-%m')
-        ORDER BY month
-        """
-
-        try:
-            results = self.db.execute(sql, fetch_all=True)
-            if results and len(results) > 0:
-                print(f"✅ 获取到 {len(results)} 个月的数据")
+                rows = spec.prepare(results) if spec.prepare else results
 
                 # 显示数据
-                print("\n📊 月度数据:")
-
-                # 先处理数据类型转换
-                processed_results = []
-                for row in results:
-                    month = row.get('month', '未知')
-                    visit_count = int(row.get('visit_count', 0))
-
-                    # 安全转换monthly_revenue为float
-                    monthly_revenue = row.get('monthly_revenue', 0)
-                    try:
-                        if monthly_revenue is None:
-                            revenue_float = 0.0
-                        elif isinstance(monthly_revenue, (int, float)):
-                            revenue_float = float(monthly_revenue)
-                        else:
-                            # 尝试转换为字符串再转浮点数
-                            revenue_float = float(str(monthly_revenue))
-                    except (ValueError, TypeError, AttributeError) as e:
-                        print(f"⚠️  转换收入数据失败: {e}, 原始值: {monthly_revenue}")
-                        revenue_float = 0.0
-
-                    print(f"  {month}:")
-                    print(f"     就诊: {visit_count}次")
-                    print(f"     收入: ¥{revenue_float:.2f}")
-
-                    # 创建处理后的数据
-                    processed_row = {
-                        'month': month,
-                        'visit_count': visit_count,
-                        'monthly_revenue': revenue_float
-                    }
-                    processed_results.append(processed_row)
-
-                # 如果数据不足6个月，添加模拟数据补全
-                if len(processed_results) < 6:
-                    print("⚠️  数据不足6个月，将补充模拟数据...")
-                    processed_results = self._add_mock_data(processed_results)
-
-                # 计算增长率
-                growth_data = []
-                for i, row in enumerate(processed_results):
-                    if i > 0:  # 从第二个月开始计算增长率
-                        prev = processed_results[i - 1]
-                        prev_count = prev.get('visit_count', 0)
-                        current_count = row.get('visit_count', 0)
-
-                        # 计算就诊增长率
-                        if prev_count > 0:
-                            growth_rate = ((current_count - prev_count) * 100.0 / prev_count)
-                        else:
-                            growth_rate = 0
-
-                        row['visit_growth_percent'] = round(growth_rate, 2)
-                    else:
-                        row['visit_growth_percent'] = 0
-
-                    growth_data.append(row)
+                print(f"\n📊 {spec.name}数据:")
+                buf = io.StringIO()
+                for i, row in enumerate(rows, 1):
+                    buf.write(spec.row_format.format(i=i, **row))
+                sys.stdout.write(buf.getvalue())
 
                 # 生成可视化图表
-                self.visualizer.visualize_monthly_growth(
-                    growth_data,
-                    title="月度就诊增长趋势"
-                )
+                if spec.render:
+                    spec.render(self, rows)
+                else:
+                    getattr(self.visualizer, spec.chart)(rows, **spec.chart_kwargs)
 
-                print("✅ 月度趋势图表已生成")
+                print(f"✅ {spec.name}图表已生成")
             else:
-                print("📭 暂无月度数据，生成模拟数据...")
-                self._demo_mock_monthly_data()
+                print(f"📭 暂无{spec.name}数据")
+                if spec.fallback:
+                    spec.fallback(self)
 
         except Exception as e:
             print(f"❌ 查询失败: {e}")
-            import traceback
-            traceback.print_exc()
-            print("\n尝试生成模拟月度数据...")
-            self._demo_mock_monthly_data()
+            if spec.fallback:
+                import traceback
+                traceback.print_exc()
+                print("\n尝试生成模拟数据...")
+                spec.fallback(self)
+
+    @staticmethod
+    def _prepare_monthly(results):
+        """将整数月份键 YYYYMM 格式化为 'YYYY-MM'"""
+        rows = list(results)
+        for row in rows:
+            ym = int(row.pop('ym'))
+            row['month'] = f"{ym // 100:04d}-{ym % 100:02d}"
+        return rows
+
+    def _render_monthly_trend(self, rows):
+        """补全不足6个月的数据后按列数组生成月度趋势图"""
+        # 如果数据不足6个月，添加模拟数据补全
+        if len(rows) < 6:
+            print("⚠️  数据不足6个月，将补充模拟数据...")
+            rows = self._add_mock_data(rows)
+
+        cols = rows_to_columns(rows, ['month', 'visit_count', 'monthly_revenue', 'visit_growth_percent'])
+        self.visualizer.visualize_monthly_growth_arrays(
+            cols['month'],
+            cols['visit_count'],
+            cols['monthly_revenue'],
+            cols['visit_growth_percent'],
+            title="月度就诊增长趋势"
+        )
 
     def _add_mock_data(self, real_data):
         """添加模拟数据补全月度数据"""
-        from datetime import datetime, timedelta
-
         if not real_data:
             return real_data
 
@@ -288,11 +282,17 @@ class SimpleMedicalVisualization:
         last_month = real_data[-1]['month']
         year, month = map(int, last_month.split('-'))
 
-        # 生成模拟月份
+        # 基于最后一个月的数据整体生成模拟数据
         mock_data = real_data.copy()
         months_needed = 6 - len(real_data)
+        last_data = real_data[-1]
+        counts, revenues = _mock_months(last_data['visit_count'], last_data['monthly_revenue'], months_needed)
+
+        # 模拟行不经过SQL，增长率在此补算
+        visit_growth = _growth_percent(counts, last_data['visit_count'])
+        revenue_growth = _growth_percent(revenues, last_data['monthly_revenue'])
 
-        for i in range(1, months_needed + 1):
+        for i in range(months_needed):
             # 计算下一个月
             if month == 12:
                 year += 1
@@ -300,17 +300,12 @@ class SimpleMedicalVisualization:
             else:
                 month += 1
 
-            month_str = f"{year:04d}-{month:02d}"
-
-            # 基于最后一个月的数据生成模拟数据
-            last_data = mock_data[-1]
-            mock_visit_count = int(last_data['visit_count'] * random.uniform(0.9, 1.1))
-            mock_revenue = last_data['monthly_revenue'] * random.uniform(0.9, 1.1)
-
             mock_data.append({
-                'month': month_str,
-                'visit_count': max(1, mock_visit_count),
-                'monthly_revenue': max(10.0, mock_revenue)
+                'month': f"{year:04d}-{month:02d}",
+                'visit_count': int(counts[i]),
+                'monthly_revenue': float(revenues[i]),
+                'visit_growth_percent': float(visit_growth[i]),
+                'revenue_growth_percent': float(revenue_growth[i])
             })
 
         return mock_data
@@ -319,40 +314,31 @@ class SimpleMedicalVisualization:
         """演示用模拟月度数据"""
         print("\n📈 生成模拟月度数据用于演示...")
 
-        from datetime import datetime, timedelta
-
-        # 生成过去6个月的模拟数据
+        # 生成过去6个月的模拟数据，有增长趋势（每月增长10%）
         growth_data = []
         current_date = datetime.now()
+        base_visits = 50
+        visit_counts = (base_visits * (1 + np.arange(6) * 0.1)).astype(np.int64)
+        revenues = visit_counts * np.random.uniform(80, 120, 6)
 
-        for i in range(6, 0, -1):
+        for idx, i in enumerate(range(6, 0, -1)):
             month_date = current_date - timedelta(days=30 * i)
-            month_str = month_date.strftime('%Y-%m')
-
-            # 模拟数据，有增长趋势
-            base_visits = 50
-            growth_factor = 1 + (6 - i) * 0.1  # 每月增长10%
-            visit_count = int(base_visits * growth_factor)
-            monthly_revenue = visit_count * random.uniform(80, 120)
-
-            # 增长率
-            if i == 6:  # 第一个月
-                growth_rate = 0
-            else:
-                growth_rate = 10.0  # 模拟10%增长
 
             growth_data.append({
-                'month': month_str,
-                'visit_count': visit_count,
-                'monthly_revenue': monthly_revenue,
-                'visit_growth_percent': growth_rate
+                'month': month_date.strftime('%Y-%m'),
+                'visit_count': int(visit_counts[idx]),
+                'monthly_revenue': float(revenues[idx]),
+                # 第一个月为0，之后模拟10%增长
+                'visit_growth_percent': 0 if idx == 0 else 10.0
             })
 
         # 显示模拟数据
         print("\n📊 模拟月度数据:")
+        buf = io.StringIO()
         for row in growth_data:
-            print(
-                f"  {row['month']}: 就诊{row['visit_count']}次, 收入¥{row['monthly_revenue']:.2f}, 增长{row['visit_growth_percent']}%")
+            buf.write(
+                f"  {row['month']}: 就诊{row['visit_count']}次, 收入¥{row['monthly_revenue']:.2f}, 增长{row['visit_growth_percent']}%\n")
+        sys.stdout.write(buf.getvalue())
 
         # 生成可视化图表
         self.visualizer.visualize_monthly_growth(
@@ -385,10 +371,64 @@ class SimpleMedicalVisualization:
         print("✅ 自定义图表已生成")
 
 
+@dataclass(frozen=True)
+class DemoSpec:
+    """一个数据库查询演示的显示与绘图规格"""
+    heading: str
+    name: str
+    count_label: str
+    row_format: str
+    chart: str = ""
+    chart_kwargs: Dict = field(default_factory=dict)
+    prepare: Optional[Callable] = None
+    render: Optional[Callable] = None
+    fallback: Optional[Callable] = None
+
+
+# 与 _fetch_demo_data 返回的结果集一一对应
+DEMOS = [
+    DemoSpec(
+        heading="2. 医生排名可视化",
+        name="医生排名",
+        count_label="位医生",
+        row_format="  {i}. {doctor_name} ({dept_name})\n"
+                   "     就诊: {visit_count}次\n"
+                   "     收入: ¥{total_revenue:.2f}\n",
+        chart='visualize_doctor_ranking',
+        chart_kwargs={'title': "医生就诊量和收入排名Top 10", 'top_n': 10}
+    ),
+    DemoSpec(
+        heading="3. 科室统计可视化",
+        name="科室统计",
+        count_label="个科室",
+        row_format="  {i}. {dept_name}\n"
+                   "     就诊: {visit_count}次\n"
+                   "     收入: ¥{total_revenue:.2f}\n",
+        chart='visualize_department_statistics',
+        chart_kwargs={'title': "科室就诊统计"}
+    ),
+    DemoSpec(
+        heading="4. 月度趋势可视化",
+        name="月度趋势",
+        count_label="个月",
+        row_format="  {month}:\n"
+                   "     就诊: {visit_count}次\n"
+                   "     收入: ¥{monthly_revenue:.2f}\n",
+        prepare=SimpleMedicalVisualization._prepare_monthly,
+        render=SimpleMedicalVisualization._render_monthly_trend,
+        fallback=SimpleMedicalVisualization._demo_mock_monthly_data
+    ),
+]
+
+
 # 主程序
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="简化版医疗数据库查询可视化演示")
+    parser.add_argument('--no-cache', action='store_true', help="忽略并不写入查询结果缓存")
+    args = parser.parse_args()
+
     print("🚀 开始简化版医疗数据库查询可视化演示...")
     print("=" * 60)
 
-    demo = SimpleMedicalVisualization()
+    demo = SimpleMedicalVisualization(use_cache=not args.no_cache)
     demo.run_simple_demos()
\ No newline at end of file
@@ -14,6 +14,7 @@ import database.connection_pool
 DatabaseConfig = database.db_config.DatabaseConfig
 BaseConnection = database.db_connection.BaseConnection
 MedicalDAO = database.medical_dao.MedicalDAO
+ConnectionPool = database.connection_pool.ConnectionPool
 get_connection_pool = database.connection_pool.get_connection_pool
 
 def test_connection():
@@ -21,28 +22,31 @@ def test_connection():
     print("🧪 测试数据库连接...")
     print("-" * 40)
 
+    # 各项测试从同一连接池借用连接，避免重复握手
+    pool = get_connection_pool()
+
     # 方法1：使用默认配置
     print("1. 使用默认配置连接:")
     try:
-        db = BaseConnection()
-        db.connect()
-
-        if db.ping():
+        with pool.connection() as conn:
+            conn.ping(reconnect=False)
             print("   ✅ 连接成功!")
-        else:
-            print("   ❌ 连接失败")
-            return False
 
-        # 测试查询
-        tables = db.get_tables()
-        print(f"   📊 数据库表数量: {len(tables)}")
+            # 测试查询
+            with conn.cursor() as cursor:
+                cursor.execute("SHOW TABLES")
+                tables = [list(row.values())[0] for row in cursor.fetchall()]
+                print(f"   📊 数据库表数量: {len(tables)}")
 
-        for table in tables:
-            count = db.count(table)
-            print(f"   📈 {table}: {count} 行")
+                # 所有表的行数合并为一条 UNION ALL 查询
+                if tables:
+                    cursor.execute(" UNION ALL ".join(
+                        f"SELECT '{table}' AS tbl, COUNT(*) AS cnt FROM `{table}`" for table in tables
+                    ))
+                    for row in cursor.fetchall():
+                        print(f"   📈 {row['tbl']}: {row['cnt']} 行")
 
-        db.close()
-        print("   ✅ 连接关闭正常")
+        print("   ✅ 连接归还正常")
 
     except Exception as e:
         print(f"   ❌ 连接失败: {e}")
@@ -58,33 +62,33 @@ def test_connection():
             database="medical_db"
         )
 
-        db = BaseConnection(config)
-        db.connect()
-
-        if db.ping():
-            print("   ✅ 连接成功!")
-        else:
-            print("   ❌ 连接失败")
-            return False
-
-        # 测试复杂查询
-        sql = """
-        SELECT 
-            (SELECT COUNT(*) FROM patients) as patient_count,
-            (SELECT COUNT(*) FROM doctors) as doctor_count,
-            (SELECT COUNT(*) FROM medical_visits) as visit_count,
-            (SELECT COUNT(*) FROM examination_records) as exam_count
-        """
-
-        result = db.execute(sql, fetch_one=True)
-        if result:
-            print("   📈 数据统计:")
-            print(f"      患者: {result['patient_count']} 人")
-            print(f"      医生: {result['doctor_count']} 人")
-            print(f"      就诊: {result['visit_count']} 次")
-            print(f"      检查: {result['exam_count']} 次")
-
-        db.close()
+        # 自定义配置不同于全局连接池，单独建立一个单连接的池
+        custom_pool = ConnectionPool(config, max_size=1)
+        try:
+            with custom_pool.connection() as conn:
+                conn.ping(reconnect=False)
+                print("   ✅ 连接成功!")
+
+                # 测试复杂查询
+                sql = """
+                SELECT 
+                    (SELECT COUNT(*) FROM patients) as patient_count,
+                    (SELECT COUNT(*) FROM doctors) as doctor_count,
+                    (SELECT COUNT(*) FROM medical_visits) as visit_count,
+                    (SELECT COUNT(*) FROM examination_records) as exam_count
+                """
+
+                with conn.cursor() as cursor:
+                    cursor.execute(sql)
+                    result = cursor.fetchone()
+                if result:
+                    print("   📈 数据统计:")
+                    print(f"      患者: {result['patient_count']} 人")
+                    print(f"      医生: {result['doctor_count']} 人")
+                    print(f"      就诊: {result['visit_count']} 次")
+                    print(f"      检查: {result['exam_count']} 次")
+        finally:
+            custom_pool.close_all()
         print("   ✅ 连接关闭正常")
 
     except Exception as e:
@@ -94,23 +98,46 @@ def test_connection():
     # 方法3：测试事务
     print("\n3. 测试事务功能:")
     try:
-        db = BaseConnection()
-        db.connect()
+        with pool.connection() as conn:
+            conn.begin()
+            try:
+                # 获取当前最大ID
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT MAX(patient_id) as max_id FROM patients")
+                    result = cursor.fetchone()
+                max_id = result.get("max_id", 0) if result else 0
+
+                print(f"   当前最大患者ID: {max_id}")
+                print("   ✅ 事务测试通过")
+            finally:
+                # 只读事务，回滚即可
+                conn.rollback()
 
-        with db.transaction():
-            # 获取当前最大ID
-            sql = "SELECT MAX(patient_id) as max_id FROM patients"
-            result = db.execute(sql, fetch_one=True)
-            max_id = result.get("max_id", 0) if result else 0
+    except Exception as e:
+        print(f"   ❌ 事务测试失败: {e}")
+        return False
 
-            print(f"   当前最大患者ID: {max_id}")
-            print("   ✅ 事务测试通过")
+    # 方法4：不经过连接池，直接测试 BaseConnection
+    print("\n4. 使用 BaseConnection 连接:")
+    db = BaseConnection()
+    try:
+        if not db.connect():
+            print("   ❌ 连接失败")
+            return False
+        print("   ✅ 连接成功!")
 
-        db.close()
+        result = db.execute("SELECT COUNT(*) as patient_count FROM patients", fetch_one=True)
+        if result is None:
+            print("   ❌ 查询失败")
+            return False
+        print(f"   📈 患者: {result['patient_count']} 人")
 
     except Exception as e:
-        print(f"   ❌ 事务测试失败: {e}")
+        print(f"   ❌ 连接失败: {e}")
         return False
+    finally:
+        db.close()
+    print("   ✅ 连接关闭正常")
 
     print("\n" + "=" * 40)
     print("🎉 所有测试通过！")
@@ -119,5 +146,7 @@ def test_connection():
 
 
 if __name__ == "__main__":
+    # 预热全局连接池
+    get_connection_pool()
     success = test_connection()
     sys.exit(0 if success else 1)
\ No newline at end of file
@@ -4,30 +4,111 @@ from pathlib import Path
 import io
 from datetime import datetime, timedelta
 import traceback
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from database.db_connection import BaseConnection
-from image_dao import ImageDAO
+from image_dao import ImageDAO, invalidate_category_cache
 from PIL import Image, ImageDraw
 
+# 各测试共享的ImageDAO实例，按线程隔离（pymysql连接不是线程安全的）
+_local = threading.local()
 
-def create_test_image(filename: str = "test_image.jpg", size: tuple = (800, 600)) -> str:
-    """创建测试图片"""
-    # 创建图片
-    img = Image.new('RGB', size, color='lightblue')
-    draw = ImageDraw.Draw(img)
 
-    # 添加文字
-    draw.text((50, 50), "测试医疗图片", fill='black')
-    draw.text((50, 100), f"创建时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", fill='black')
+def get_image_dao() -> ImageDAO:
+    """获取当前线程共享的ImageDAO实例"""
+    image_dao = getattr(_local, 'image_dao', None)
+    if image_dao is None:
+        image_dao = _local.image_dao = ImageDAO(pooled=True)
+    return image_dao
+
+
+class _ThreadOutput:
+    """
+    按线程分流的输出流：当前线程设置了缓冲区时写入缓冲区，否则写入原始流
+
+    contextlib.redirect_stdout 替换的是进程级的 sys.stdout，并发线程各自重定向会互相覆盖，
+    因此安装一次该对象，由线程局部的缓冲区区分各测试的输出
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def write(self, text):
+        buffer = getattr(_local, 'output', None)
+        return (buffer or self._stream).write(text)
+
+    def flush(self):
+        if getattr(_local, 'output', None) is None:
+            self._stream.flush()
+
+
+def _run_buffered(test_func, *args) -> str:
+    """在当前线程中运行测试，返回其完整输出（含异常堆栈）"""
+    _local.output = io.StringIO()
+    try:
+        test_func(*args)
+    except Exception:
+        traceback.print_exc()
+    finally:
+        output, _local.output = _local.output.getvalue(), None
+    return output
+
+
+# 测试图片缓存：尺寸 -> 已绘制静态文字的底图；(尺寸, 分钟时间戳) -> 编码后的JPEG
+_BASE_IMAGES = {}
+_JPEG_CACHE = {}
+
+
+def _test_image_bytes(size: tuple) -> bytes:
+    """生成测试图片的JPEG数据，同一分钟内相同尺寸直接复用已编码结果"""
+    stamp = datetime.now().strftime('%Y-%m-%d %H:%M')
+    data = _JPEG_CACHE.get((size, stamp))
+    if data is None:
+        base = _BASE_IMAGES.get(size)
+        if base is None:
+            base = Image.new('RGB', size, color='lightblue')
+            ImageDraw.Draw(base).text((50, 50), "测试医疗图片", fill='black')
+            _BASE_IMAGES[size] = base
+
+        # 只在底图副本上绘制时间戳
+        img = base.copy()
+        ImageDraw.Draw(img).text((50, 100), f"创建时间: {stamp}", fill='black')
+
+        buf = io.BytesIO()
+        img.save(buf, 'JPEG', quality=75)
+        data = _JPEG_CACHE[(size, stamp)] = buf.getvalue()
+    return data
+
+
+def create_test_image(filename: str = "test_image.jpg", size: tuple = (800, 600),
+                      stream: io.BytesIO = None):
+    """
+    创建测试图片
+
+    Args:
+        filename: 保存到 temp_images 下的文件名
+        size: 图片尺寸
+        stream: 传入时直接编码到该内存流，不写临时文件
+
+    Returns:
+        传入stream时返回已回到开头的stream，否则返回文件路径
+    """
+    data = _test_image_bytes(size)
+
+    if stream is not None:
+        stream.write(data)
+        stream.seek(0)
+        return stream
 
     # 保存到临时文件
     temp_dir = Path("temp_images")
     temp_dir.mkdir(exist_ok=True)
 
     filepath = temp_dir / filename
-    img.save(filepath, 'JPEG', quality=95)
+    filepath.write_bytes(data)
 
     return str(filepath)
 
@@ -36,7 +117,7 @@ def test_database_connection():
     """测试数据库连接"""
     print("🔧 测试数据库连接...")
 
-    db = BaseConnection()
+    db = BaseConnection(pooled=True)
     try:
         db.connect()
 
@@ -67,88 +148,78 @@ def test_database_connection():
         db.close()
 
 
-def ensure_patient_exists(db, patient_id=1):
-    """确保患者存在"""
+def ensure_patient_exists(db, patient_id=1, commit=True):
+    """确保患者存在，commit=False时由调用方统一提交"""
     try:
-        # 检查患者是否存在
-        check_sql = "SELECT patient_id, name FROM patients WHERE patient_id = %s"
-        patient = db.execute(check_sql, (patient_id,), fetch_one=True)
+        # 单条语句完成"不存在则创建"；已存在时不修改数据，LAST_INSERT_ID 返回现有ID
+        create_sql = """
+        INSERT INTO patients (
+            patient_id, name, gender, birth_date, phone, address, 
+            blood_type, empi_code, is_active
+        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE patient_id = LAST_INSERT_ID(patient_id)
+        """
 
-        if patient:
-            print(f"   患者已存在: ID={patient['patient_id']}, 姓名={patient.get('name', '未知')}")
-            return patient_id
-        else:
-            # 创建患者
-            print(f"   创建患者 ID={patient_id}...")
-            create_sql = """
-            INSERT INTO patients (
-                patient_id, name, gender, birth_date, phone, address, 
-                blood_type, empi_code, is_active
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ON DUPLICATE KEY UPDATE name = VALUES(name)
-            """
-
-            import datetime
-            params = (
-                patient_id,
-                f'测试患者{patient_id}',
-                'M',
-                '1990-01-01',
-                '13800138000',
-                '测试地址',
-                'O',
-                f'TEST{datetime.datetime.now().strftime("%Y%m%d%H%M%S")}',
-                1
-            )
-
-            result = db.execute(create_sql, params, commit=True)
-            if result is not None:
-                print(f"   患者创建成功，ID: {patient_id}")
-                return patient_id
+        params = (
+            patient_id,
+            f'测试患者{patient_id}',
+            'M',
+            '1990-01-01',
+            '13800138000',
+            '测试地址',
+            'O',
+            f'TEST{datetime.now().strftime("%Y%m%d%H%M%S")}',
+            1
+        )
+
+        db.execute(create_sql, params, commit=commit)
+        row_id = db.connection.insert_id()
+        if row_id:
+            if db.connection.affected_rows() == 1:
+                print(f"   患者创建成功，ID: {row_id}")
             else:
-                # 如果插入失败，尝试获取现有患者
-                get_any_sql = "SELECT patient_id FROM patients ORDER BY patient_id LIMIT 1"
-                any_patient = db.execute(get_any_sql, fetch_one=True)
-                if any_patient and 'patient_id' in any_patient:
-                    return any_patient['patient_id']
-                return None
+                print(f"   患者已存在: ID={row_id}")
+            return row_id
+
+        # 如果插入失败，尝试获取现有患者
+        get_any_sql = "SELECT patient_id FROM patients ORDER BY patient_id LIMIT 1"
+        any_patient = db.execute(get_any_sql, fetch_one=True)
+        if any_patient and 'patient_id' in any_patient:
+            return any_patient['patient_id']
+        return None
 
     except Exception as e:
         print(f"   确保患者存在时出错: {e}")
         return None
 
 
-def ensure_category_exists(db, category_id=1):
-    """确保分类存在"""
+def ensure_category_exists(db, category_id=1, commit=True):
+    """确保分类存在，commit=False时由调用方统一提交"""
     try:
-        # 检查分类是否存在
-        check_sql = "SELECT category_id, category_name FROM image_categories WHERE category_id = %s"
-        category = db.execute(check_sql, (category_id,), fetch_one=True)
+        # 单条语句完成"不存在则创建"；已存在时不修改数据，LAST_INSERT_ID 返回现有ID
+        create_sql = """
+        INSERT INTO image_categories (category_id, category_name, description) 
+        VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE category_id = LAST_INSERT_ID(category_id)
+        """
 
-        if category:
-            print(f"   分类已存在: ID={category['category_id']}, 名称={category.get('category_name', '未知')}")
-            return category_id
-        else:
-            # 创建分类
-            print(f"   创建分类 ID={category_id}...")
-            create_sql = """
-            INSERT INTO image_categories (category_id, category_name, description) 
-            VALUES (%s, %s, %s)
-            ON DUPLICATE KEY UPDATE category_name = VALUES(category_name)
-            """
-
-            params = (category_id, '测试分类', '测试用分类')
-            result = db.execute(create_sql, params, commit=True)
-            if result is not None:
-                print(f"   分类创建成功，ID: {category_id}")
-                return category_id
+        params = (category_id, '测试分类', '测试用分类')
+        db.execute(create_sql, params, commit=commit)
+        row_id = db.connection.insert_id()
+        if row_id:
+            if db.connection.affected_rows() == 1:
+                invalidate_category_cache()
+                print(f"   分类创建成功，ID: {row_id}")
             else:
-                # 获取现有分类
-                get_any_sql = "SELECT category_id FROM image_categories ORDER BY category_id LIMIT 1"
-                any_category = db.execute(get_any_sql, fetch_one=True)
-                if any_category and 'category_id' in any_category:
-                    return any_category['category_id']
-                return 1
+                print(f"   分类已存在: ID={row_id}")
+            return row_id
+
+        # 获取现有分类
+        get_any_sql = "SELECT category_id FROM image_categories ORDER BY category_id LIMIT 1"
+        any_category = db.execute(get_any_sql, fetch_one=True)
+        if any_category and 'category_id' in any_category:
+            return any_category['category_id']
+        return 1
 
     except Exception as e:
         print(f"   确保分类存在时出错: {e}")
@@ -160,79 +231,67 @@ def test_image_upload():
     print("\n📤 测试图片上传")
     print("-" * 40)
 
-    db = BaseConnection()
+    image_dao = get_image_dao()
 
     try:
-        if not db.connect():
-            print("❌ 数据库连接失败")
-            return None
-
-        # 临时禁用外键检查
-        print("   临时禁用外键检查...")
-        db.execute("SET FOREIGN_KEY_CHECKS = 0", commit=True)
-
-        # 1. 确保患者存在
-        print("1. 确保患者存在...")
-        patient_id = ensure_patient_exists(db, 1)
-        if not patient_id:
-            print("❌ 无法获取患者ID")
-            return None
-
-        # 2. 确保分类存在
-        print("\n2. 确保分类存在...")
-        category_id = ensure_category_exists(db, 1)
-
-        print(f"   使用患者ID: {patient_id}, 分类ID: {category_id}")
-
-        # 3. 创建测试图片
-        print("\n3. 创建测试图片...")
-        test_image_path = create_test_image("patient_photo.jpg", (1024, 768))
-
-        # 读取图片文件
-        with open(test_image_path, 'rb') as f:
-            file_stream = io.BytesIO(f.read())
-
-        # 4. 创建ImageDAO实例
-        image_dao = ImageDAO()
-
-        # 准备图片数据
-        image_data = {
-            'original_filename': 'patient_photo.jpg',
-            'mime_type': 'image/jpeg',
-            'category_id': category_id,
-            'patient_id': patient_id,
-            'doctor_id': 1,
-            'title': '患者面部照片',
-            'description': '门诊拍摄的患者面部照片',
-            'tags': '门诊,面部,初诊',
-            'is_public': False,
-            'uploaded_by': 1
-        }
-
-        # 5. 上传图片
-        print("\n4. 上传图片...")
-        try:
-            image_id = image_dao.add_image(image_data, file_stream)
-            print(f"✅ 图片上传成功，ID: {image_id}")
-            return image_id
-
-        except Exception as e:
-            print(f"❌ 图片上传失败: {e}")
-            traceback.print_exc()
-            return None
+        # bulk_insert 复用同一连接并临时禁用外键检查；患者、分类、图片三条写入
+        # 放在同一事务中，由 add_image 统一提交，只需一次提交刷盘
+        with image_dao.bulk_insert():
+            db = image_dao.db
+            db.connection.begin()
+
+            try:
+                # 1. 确保患者存在
+                print("1. 确保患者存在...")
+                patient_id = ensure_patient_exists(db, 1, commit=False)
+                if not patient_id:
+                    print("❌ 无法获取患者ID")
+                    db.connection.rollback()
+                    return None
+
+                # 2. 确保分类存在
+                print("\n2. 确保分类存在...")
+                category_id = ensure_category_exists(db, 1, commit=False)
+
+                print(f"   使用患者ID: {patient_id}, 分类ID: {category_id}")
+
+                # 3. 创建测试图片
+                print("\n3. 创建测试图片...")
+                file_stream = create_test_image("patient_photo.jpg", (1024, 768), stream=io.BytesIO())
+            except Exception:
+                db.connection.rollback()
+                raise
+
+            # 准备图片数据
+            image_data = {
+                'original_filename': 'patient_photo.jpg',
+                'mime_type': 'image/jpeg',
+                'category_id': category_id,
+                'patient_id': patient_id,
+                'doctor_id': 1,
+                'title': '患者面部照片',
+                'description': '门诊拍摄的患者面部照片',
+                'tags': '门诊,面部,初诊',
+                'is_public': False,
+                'uploaded_by': 1
+            }
+
+            # 4. 上传图片（提交整个事务，失败时整体回滚）
+            print("\n4. 上传图片...")
+            try:
+                image_id = image_dao.add_image(image_data, file_stream)
+                print(f"✅ 图片上传成功，ID: {image_id}")
+                return image_id
+
+            except Exception as e:
+                print(f"❌ 图片上传失败: {e}")
+                traceback.print_exc()
+                return None
 
     except Exception as e:
         print(f"❌ 测试失败: {e}")
         traceback.print_exc()
         return None
-    finally:
-        try:
-            # 重新启用外键检查
-            if db.connection:
-                db.execute("SET FOREIGN_KEY_CHECKS = 1", commit=True)
-        except:
-            pass
-        db.close()
 
 
 def test_image_retrieval(image_id: int):
@@ -241,7 +300,7 @@ def test_image_retrieval(image_id: int):
     print("-" * 40)
 
     try:
-        image_dao = ImageDAO()
+        image_dao = get_image_dao()
 
         # 获取图片信息
         image_info = image_dao.get_image_by_id(image_id)
@@ -270,7 +329,7 @@ def test_patient_images(patient_id: int = 1):
     print("-" * 40)
 
     try:
-        image_dao = ImageDAO()
+        image_dao = get_image_dao()
 
         # 获取患者图片
         images, total = image_dao.get_patient_images(patient_id, page=1, page_size=10)
@@ -293,7 +352,7 @@ def test_image_search():
     print("-" * 40)
 
     try:
-        image_dao = ImageDAO()
+        image_dao = get_image_dao()
 
         # 搜索条件
         search_criteria = {
@@ -323,7 +382,7 @@ def test_image_update(image_id: int):
     print("-" * 40)
 
     try:
-        image_dao = ImageDAO()
+        image_dao = get_image_dao()
 
         # 更新数据
         update_data = {
@@ -362,7 +421,7 @@ def test_image_delete(image_id: int):
     print("-" * 40)
 
     try:
-        image_dao = ImageDAO()
+        image_dao = get_image_dao()
 
         # 软删除
         success = image_dao.delete_image(image_id, soft_delete=True)
@@ -393,7 +452,7 @@ def test_categories():
     print("-" * 40)
 
     try:
-        image_dao = ImageDAO()
+        image_dao = get_image_dao()
 
         # 获取所有分类
         categories = image_dao.get_categories()
@@ -421,23 +480,29 @@ def main():
         print("\n❌ 数据库测试失败，请先创建表结构")
         return
 
-    # 2. 测试分类功能
-    test_categories()
-
-    # 3. 测试图片上传
+    # 2. 测试图片上传
     image_id = test_image_upload()
     if not image_id:
         print("\n❌ 测试终止：图片上传失败")
         return
 
-    # 4. 测试图片检索
-    test_image_retrieval(image_id)
-
-    # 5. 测试获取患者图片
-    test_patient_images(1)
-
-    # 6. 测试图片搜索
-    test_image_search()
+    # 3~6. 分类、检索、患者图片、搜索均为只读且相互独立，并发执行；
+    # 各测试的输出先写入各自的缓冲区，再按顺序整体打印，避免交错
+    stdout, stderr = sys.stdout, sys.stderr
+    sys.stdout, sys.stderr = _ThreadOutput(stdout), _ThreadOutput(stderr)
+    try:
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = [
+                executor.submit(_run_buffered, test_categories),
+                executor.submit(_run_buffered, test_image_retrieval, image_id),
+                executor.submit(_run_buffered, test_patient_images, 1),
+                executor.submit(_run_buffered, test_image_search),
+            ]
+            for future in futures:
+                stdout.write(future.result())
+                stdout.flush()
+    finally:
+        sys.stdout, sys.stderr = stdout, stderr
 
     # 7. 测试图片更新
     test_image_update(image_id)
@@ -0,0 +1,86 @@
+"""
+可视化数据转换测试脚本
+"""
+
+import os
+import tempfile
+
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+
+from visualization import MedicalQueryVisualizer, rows_to_columns
+
+
+def test_rows_to_columns_nullable_string_column():
+    """测试首行为空值的字符串列"""
+    print("🔍 测试首行为空值的字符串列...")
+
+    rows = [
+        {'gender': None, 'blood_type': None, 'age': 30},
+        {'gender': 'M', 'blood_type': 'A', 'age': None},
+        {'gender': 'F', 'blood_type': 'O', 'age': 45},
+    ]
+    columns = rows_to_columns(rows, ['gender', 'blood_type', 'age'])
+
+    assert columns['gender'].dtype == object
+    assert list(columns['gender']) == [None, 'M', 'F']
+    assert list(columns['blood_type']) == [None, 'A', 'O']
+    assert columns['age'].dtype == np.float64
+    assert list(columns['age']) == [30.0, 0.0, 45.0]
+    print("  ✅ 字符串列保持为object数组，数值列空值记为0")
+
+
+def test_rows_to_columns_all_null_column():
+    """测试全部为空值的列"""
+    print("🔍 测试全部为空值的列...")
+
+    columns = rows_to_columns([{'age': None}, {}], ['age'])
+
+    assert columns['age'].dtype == np.float64
+    assert list(columns['age']) == [0.0, 0.0]
+    print("  ✅ 全空列按数值列处理")
+
+
+def test_rows_to_columns_all_null_text_column():
+    """测试全部为空值的文本列"""
+    print("🔍 测试全部为空值的文本列...")
+
+    columns = rows_to_columns([{'blood_type': None}, {}], ['blood_type'], text_keys=('blood_type',))
+
+    assert columns['blood_type'].dtype == object
+    assert list(columns['blood_type']) == [None, None]
+    print("  ✅ 文本列全空时仍为object数组")
+
+
+def test_patient_demographics_without_blood_type():
+    """测试血型全部缺失时的患者分布图"""
+    print("🔍 测试血型全部缺失时的患者分布图...")
+
+    patients = [
+        {'gender': 'M', 'age': 30, 'visit_count': 2},
+        {'gender': 'F', 'blood_type': None, 'age': 45, 'visit_count': 1},
+    ]
+    with tempfile.TemporaryDirectory() as output_dir:
+        visualizer = MedicalQueryVisualizer(output_dir)
+        try:
+            path = visualizer.visualize_patient_demographics(patients)
+        finally:
+            visualizer.close()
+        assert os.path.exists(path)
+    print("  ✅ 缺失血型记为'未知'，图表正常生成")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("📊 可视化数据转换测试")
+    print("=" * 60)
+
+    test_rows_to_columns_nullable_string_column()
+    test_rows_to_columns_all_null_column()
+    test_rows_to_columns_all_null_text_column()
+    test_patient_demographics_without_blood_type()
+
+    print("\n" + "=" * 60)
+    print("✅ 测试完成")
+    print("=" * 60)
@@ -6,9 +6,17 @@
 import pymysql
 from pymysql import cursors
 import sys
+import random
+import argparse
 
-def verify_data():
-    """验证数据完整性"""
+def verify_data(exact: bool = False):
+    """
+    验证数据完整性
+
+    Args:
+        exact: 是否用 COUNT(*) 精确统计各表行数；默认只精确统计质量检查
+               本来就要扫描的表，其余表读取 information_schema 中的估算行数
+    """
     db_config = {
         'host': 'localhost',
         'user': 'med_user',
@@ -33,57 +41,78 @@ def verify_data():
             'examination_records'
         ]
 
-        print("\n📊 1. 各表数据量统计:")
+        # 质量检查：(名称, 表, 需非空的列)
+        checks = [
+            ("患者有EMPI编码", 'patients', 'empi_code'),
+            ("医生有工号", 'doctors', 'doctor_number'),
+            ("检查记录有结果", 'examination_records', 'result_summary'),
+            ("就诊记录有诊断", 'medical_visits', 'diagnosis'),
+        ]
+        check_columns = {table: column for _, table, column in checks}
+
+        # 质量检查用 COUNT(列) 与该表的 COUNT(*) 在同一次扫描中完成；
+        # exact 时其余表也并入这条 UNION ALL 查询
+        counted = tables if exact else list(check_columns)
+        cursor.execute(" UNION ALL ".join(
+            f"SELECT COUNT(*) as count, "
+            f"{'COUNT(' + check_columns[table] + ')' if table in check_columns else 'NULL'} as checked "
+            f"FROM {table}"
+            for table in counted
+        ))
+        rows = dict(zip(counted, cursor.fetchall()))
+        exact_counts = {table: rows[table]['count'] for table in counted}
+        check_counts = [rows[table]['checked'] for _, table, _ in checks]
+
+        estimated = [table for table in tables if table not in exact_counts]
+        estimates = {}
+        if estimated:
+            # 未扫描的表行数取自表统计信息（InnoDB为估算值），一次元数据查询覆盖；
+            # 关闭本会话的统计缓存，避免读到数据生成前缓存的旧值
+            cursor.execute("SET SESSION information_schema_stats_expiry = 0")
+            cursor.execute(f"""
+                SELECT TABLE_NAME as table_name, TABLE_ROWS as table_rows
+                FROM information_schema.TABLES
+                WHERE TABLE_SCHEMA = DATABASE()
+                  AND TABLE_NAME IN ({', '.join(['%s'] * len(estimated))})
+            """, estimated)
+            estimates = {row['table_name']: int(row['table_rows'] or 0) for row in cursor.fetchall()}
+
+        print(f"\n📊 1. 各表数据量统计{'（~ 为估算值）' if estimated else ''}:")
         print("-" * 40)
 
         for table in tables:
-            cursor.execute(f"SELECT COUNT(*) as count FROM {table}")
-            result = cursor.fetchone()
-            print(f"{table:20} | {result['count']:6d} 行")
+            if table in exact_counts:
+                print(f"{table:20} |  {exact_counts[table]:6d} 行")
+            else:
+                print(f"{table:20} | ~{estimates.get(table, 0):6d} 行")
 
         # 2. 关键业务数据验证
         print("\n🔍 2. 业务数据验证:")
         print("-" * 40)
 
-        # 验证患者就诊覆盖
+        # 覆盖率的分母直接使用第1步的精确计数
         cursor.execute("""
             SELECT 
-                COUNT(*) as total_patients,
-                COUNT(DISTINCT mv.patient_id) as patients_with_visits,
-                ROUND(COUNT(DISTINCT mv.patient_id) * 100.0 / COUNT(*), 1) as coverage_rate
-            FROM patients p
-            LEFT JOIN medical_visits mv ON p.patient_id = mv.patient_id
+                COUNT(DISTINCT patient_id) as patients_with_visits,
+                COUNT(DISTINCT doctor_id) as doctors_with_visits
+            FROM medical_visits
         """)
-        coverage = cursor.fetchone()
-        print(
-            f"患者就诊覆盖率: {coverage['coverage_rate']}% ({coverage['patients_with_visits']}/{coverage['total_patients']})")
+        participation = cursor.fetchone()
+
+        # 验证患者就诊覆盖
+        total_patients = exact_counts['patients']
+        patients_with_visits = participation['patients_with_visits']
+        coverage_rate = round(patients_with_visits * 100.0 / total_patients, 1) if total_patients else 0
+        print(f"患者就诊覆盖率: {coverage_rate}% ({patients_with_visits}/{total_patients})")
 
         # 验证医生有就诊记录
-        cursor.execute("""
-            SELECT 
-                COUNT(*) as total_doctors,
-                COUNT(DISTINCT mv.doctor_id) as doctors_with_visits
-            FROM doctors d
-            LEFT JOIN medical_visits mv ON d.doctor_id = mv.doctor_id
-        """)
-        doctors = cursor.fetchone()
-        print(f"医生就诊参与率: {doctors['doctors_with_visits']}/{doctors['total_doctors']}")
+        print(f"医生就诊参与率: {participation['doctors_with_visits']}/{exact_counts['doctors']}")
 
         # 3. 数据质量检查
         print("\n✅ 3. 数据质量检查:")
         print("-" * 40)
 
-        checks = [
-            ("患者有EMPI编码", "SELECT COUNT(*) FROM patients WHERE empi_code IS NOT NULL"),
-            ("医生有工号", "SELECT COUNT(*) FROM doctors WHERE doctor_number IS NOT NULL"),
-            ("检查记录有结果", "SELECT COUNT(*) FROM examination_records WHERE result_summary IS NOT NULL"),
-            ("就诊记录有诊断", "SELECT COUNT(*) FROM medical_visits WHERE diagnosis IS NOT NULL"),
-        ]
-
-        for check_name, sql in checks:
-            cursor.execute(sql)
-            result = cursor.fetchone()
-            count = list(result.values())[0]
+        for (check_name, _, _), count in zip(checks, check_counts):
             status = "✓" if count > 0 else "✗"
             print(f"{status} {check_name}: {count}")
 
@@ -91,28 +120,36 @@ def verify_data():
         print("\n👥 4. 数据样本查看:")
         print("-" * 40)
 
-        # 查看一个完整的就诊流程样本
-        cursor.execute("""
-            SELECT 
-                p.name as patient_name,
-                p.gender,
-                p.blood_type,
-                mv.visit_date,
-                mv.diagnosis,
-                d.name as doctor_name,
-                d.title as doctor_title,
-                COUNT(er.exam_id) as exam_count
-            FROM medical_visits mv
-            JOIN patients p ON mv.patient_id = p.patient_id
-            JOIN doctors d ON mv.doctor_id = d.doctor_id
-            LEFT JOIN examination_records er ON mv.visit_id = er.visit_id
-            GROUP BY mv.visit_id
-            ORDER BY RAND()
-            LIMIT 3
-        """)
+        # 在主键范围内随机取点，用索引定位样本，避免 ORDER BY RAND() 全表排序
+        cursor.execute("SELECT MIN(visit_id) as min_id, MAX(visit_id) as max_id FROM medical_visits")
+        id_range = cursor.fetchone()
+        samples = []
+        if id_range['min_id'] is not None:
+            picks = [random.randint(id_range['min_id'], id_range['max_id']) for _ in range(3)]
+            pick_sql = "(SELECT visit_id FROM medical_visits WHERE visit_id >= %s ORDER BY visit_id LIMIT 1)"
+
+            # 查看一个完整的就诊流程样本
+            cursor.execute(f"""
+                SELECT 
+                    p.name as patient_name,
+                    p.gender,
+                    p.blood_type,
+                    mv.visit_date,
+                    mv.diagnosis,
+                    d.name as doctor_name,
+                    d.title as doctor_title,
+                    COUNT(er.exam_id) as exam_count
+                FROM ({" UNION ".join([pick_sql] * len(picks))}) picked
+                JOIN medical_visits mv ON mv.visit_id = picked.visit_id
+                JOIN patients p ON mv.patient_id = p.patient_id
+                JOIN doctors d ON mv.doctor_id = d.doctor_id
+                LEFT JOIN examination_records er ON mv.visit_id = er.visit_id
+                GROUP BY mv.visit_id
+            """, picks)
+            samples = cursor.fetchall()
 
         print("随机就诊样本:")
-        for i, row in enumerate(cursor.fetchall(), 1):
+        for i, row in enumerate(samples, 1):
             print(f"\n 样本{i}:")
             print(f"   患者: {row['patient_name']}({row['gender']}, {row['blood_type']}型)")
             print(f"   就诊: {row['visit_date'].strftime('%Y-%m-%d')} - {row['diagnosis']}")
@@ -135,5 +172,10 @@ def verify_data():
 
 
 if __name__ == "__main__":
-    success = verify_data()
+    parser = argparse.ArgumentParser(description="验证模拟数据是否成功生成")
+    parser.add_argument("--exact", action="store_true",
+                        help="使用 COUNT(*) 精确统计所有表的行数（默认未扫描的表使用统计信息估算）")
+    args = parser.parse_args()
+
+    success = verify_data(exact=args.exact)
     sys.exit(0 if success else 1)
\ No newline at end of file
@@ -3,12 +3,21 @@
 使用Matplotlib创建各种图表
 """
 
-import matplotlib.pyplot as plt
+import os
 import matplotlib
+
+# 默认只保存图片，使用无界面的Agg后端；设置 MEDVIZ_INTERACTIVE=1 时保留交互式后端（show_chart）
+_INTERACTIVE = os.getenv("MEDVIZ_INTERACTIVE", "0").lower() in ("1", "true", "yes")
+if not _INTERACTIVE:
+    matplotlib.use('Agg')
+
+import matplotlib.pyplot as plt
 from matplotlib import font_manager
 import numpy as np
 from datetime import datetime
-import os
+from functools import lru_cache, wraps
+from itertools import count
+import numbers
 import platform
 from typing import List, Dict, Tuple
 import warnings
@@ -17,6 +26,15 @@ import warnings
 warnings.filterwarnings('ignore')
 
 
+@lru_cache(maxsize=None)
+def _find_font(font_name: str):
+    """按名称查找字体文件，找不到时返回None（不回退到默认字体）；结果按名称缓存"""
+    try:
+        return font_manager.findfont(font_name, fallback_to_default=False)
+    except ValueError:
+        return None
+
+
 class FontManager:
     """字体管理器类"""
 
@@ -55,20 +73,19 @@ class FontManager:
                 "Arial"
             ]
 
-        # 尝试找到可用的中文字体
-        available_fonts = []
-        for font_name in font_names:
+        # 优先在导入时注册本机中文字体文件，之后按名称查找无需再扫描字体目录
+        font_path = FontManager.get_chinese_font_path()
+        if font_path:
             try:
-                # 检查字体是否可用
-                font_path = font_manager.findfont(font_name)
-                if font_path and font_path.lower() != 'none':
-                    available_fonts.append(font_name)
-            except:
-                continue
-
-        if available_fonts:
-            # 使用找到的第一个可用字体
-            selected_font = available_fonts[0]
+                font_manager.fontManager.addfont(font_path)
+                font_names.insert(0, font_manager.FontProperties(fname=font_path).get_name())
+            except Exception as e:
+                print(f"⚠️  注册字体文件失败: {e}")
+
+        # 按优先级查找，命中第一个可用字体即停止
+        selected_font = next((name for name in font_names if _find_font(name)), None)
+
+        if selected_font:
             plt.rcParams['font.sans-serif'] = [selected_font]
             plt.rcParams['axes.unicode_minus'] = False
             print(f"✅ 使用字体: {selected_font}")
@@ -116,8 +133,82 @@ class FontManager:
 # 初始化字体设置
 selected_font = FontManager.setup_chinese_font()
 
-# 设置图表样式
-plt.style.use('seaborn-v0_8-darkgrid')
+# 设置图表样式：内联 seaborn-v0_8-darkgrid 中实际用到的配置项，
+# 免去导入时解析样式表；也不会像整套样式那样覆盖上面设置的中文字体
+_DARKGRID_RC = {
+    'axes.facecolor': '#EAEAF2',
+    'axes.edgecolor': 'white',
+    'axes.linewidth': 0,
+    'axes.grid': True,
+    'axes.axisbelow': True,
+    'axes.labelcolor': '.15',
+    'grid.color': 'white',
+    'grid.linestyle': '-',
+    'text.color': '.15',
+    'xtick.color': '.15',
+    'ytick.color': '.15',
+    'xtick.major.size': 0,
+    'ytick.major.size': 0,
+    'legend.frameon': False,
+}
+plt.rcParams.update(_DARKGRID_RC)
+
+# PNG保存参数：经Pillow以低压缩级别编码，文件略大但编码耗时约减半
+_PNG_SAVE_KWARGS = {
+    'metadata': {'Software': 'MedViz'},
+    'pil_kwargs': {'optimize': False, 'compress_level': 1},
+}
+
+
+def rows_to_columns(rows: List[Dict], keys: List[str],
+                    text_keys: Tuple[str, ...] = ()) -> Dict[str, np.ndarray]:
+    """
+    将查询结果（行字典列表）转换为按列存放的NumPy数组
+
+    Args:
+        rows: 查询结果
+        keys: 需要提取的列名
+        text_keys: 始终按object数组返回的文本列（全部为空值时也不转为数值列）
+
+    Returns:
+        列名到数组的映射；数值列（含Decimal）为float64，其余列为object数组
+    """
+    columns = {}
+    for key in keys:
+        # 按第一个非空值判断列类型，可空的字符串列首行为None时不能误判为数值列
+        first = next((row[key] for row in rows if row.get(key) is not None), None)
+        if key not in text_keys and (first is None or isinstance(first, numbers.Number)):
+            columns[key] = np.fromiter((row.get(key) or 0 for row in rows),
+                                       dtype=np.float64, count=len(rows))
+        else:
+            columns[key] = np.array([row.get(key) for row in rows], dtype=object)
+    return columns
+
+
+def _shorten_names(names, max_len: int, default: str) -> np.ndarray:
+    """
+    批量缩短名称以防止显示问题：超过max_len的截断并追加'..'，空值替换为default
+
+    Returns:
+        Unicode字符串数组
+    """
+    names = np.asarray(names, dtype=object)
+    names = np.where(np.equal(names, None) | np.equal(names, ''), default, names).astype(str)
+    return np.where(np.char.str_len(names) > max_len,
+                    np.char.add(names.astype(f'<U{max_len}'), '..'),
+                    names)
+
+
+def _with_chinese_font(method):
+    """
+    绘图方法装饰器：在整个绘制、保存过程中通过 rc_context 使用中文字体，
+    替代逐个坐标轴、逐个刻度标签设置字体
+    """
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with matplotlib.rc_context(self._font_rc):
+            return method(self, *args, **kwargs)
+    return wrapper
 
 
 class MedicalVisualizer:
@@ -132,35 +223,82 @@ class MedicalVisualizer:
         """
         self.output_dir = output_dir
         os.makedirs(output_dir, exist_ok=True)
-
-        # 设置字体
+        # 保存路径前缀只拼接一次
+        self._output_prefix = os.path.join(os.fspath(output_dir), '')
+
+        # 非交互模式下关闭pyplot交互绘制，图表只在保存时渲染
+        if not _INTERACTIVE:
+            plt.ioff()
+
+        # 设置字体：构造一次FontProperties供所有文本复用，避免每次调用都从字典重新解析；
+        # 按字体族而非单个字体文件指定，加粗标题才能匹配到该字体族的粗体字形
+        # （本机字体文件已在导入时注册，字体族名称可直接解析）
+        self.font_properties = font_manager.FontProperties(family=selected_font or 'sans-serif', size=12)
+        self._font_rc = {'axes.unicode_minus': False}
         if selected_font:
-            self.font_properties = {'family': selected_font, 'size': 12}
-        else:
-            self.font_properties = {'family': 'sans-serif', 'size': 12}
-
-    def _set_chinese_font(self, ax=None):
-        """设置中文字体"""
-        if ax:
-            for item in ([ax.title, ax.xaxis.label, ax.yaxis.label] +
-                         ax.get_xticklabels() + ax.get_yticklabels()):
-                item.set_fontname(self.font_properties['family'])
+            self._font_rc['font.sans-serif'] = [selected_font]
+
+        # 各图表方法默认复用的Figure，首次绘图时创建，close() 时释放
+        self._fig = None
+
+        # 图表文件名：实例创建时间+进程号只取一次，之后用递增序号区分，同一秒内多次保存也不会覆盖
+        self._run_stamp = f"{datetime.now():%Y%m%d_%H%M%S}_{os.getpid()}"
+        self._chart_seq = count()
+
+    def _subplots(self, fig, *args, **kwargs):
+        """
+        创建子图；清空并复用传入的fig，未传入时复用本实例的Figure，避免重复分配画布
+        统一启用 constrained_layout，由布局引擎在绘制时一次完成排版（含总标题、双Y轴）
+
+        Returns:
+            与 plt.subplots 相同的 (fig, axes)
+        """
+        if fig is None:
+            if self._fig is None or not plt.fignum_exists(self._fig.number):
+                self._fig = plt.figure()
+            fig = self._fig
+
+        fig.clf()
+        if 'figsize' in kwargs:
+            fig.set_size_inches(kwargs.pop('figsize'))
+        if hasattr(fig, 'set_layout_engine'):  # matplotlib >= 3.6
+            fig.set_layout_engine('constrained')
         else:
-            plt.rcParams['font.sans-serif'] = [self.font_properties['family']]
-            plt.rcParams['axes.unicode_minus'] = False
+            fig.set_constrained_layout(True)
+        # 设为当前Figure，使 plt.suptitle/savefig 作用于它
+        plt.figure(fig.number)
+        return fig, fig.subplots(*args, **kwargs)
+
+    def _chart_filename(self, prefix: str) -> str:
+        """生成不重复的图表文件名"""
+        return f"{prefix}_{self._run_stamp}_{next(self._chart_seq):06d}.png"
 
     def save_chart(self, filename: str) -> str:
-        """保存图表到文件"""
-        filepath = os.path.join(self.output_dir, filename)
-        plt.tight_layout()
-        plt.savefig(filepath, dpi=300, bbox_inches='tight', facecolor='white')
+        """
+        保存图表到文件
+
+        柱状图、直方图、饼图等填充图元创建时已标记为栅格化，导出PDF/SVG时只有它们
+        按dpi渲染为位图，坐标轴和文字仍为矢量；布局已由constrained_layout确定，
+        不再使用 bbox_inches='tight'（它会额外触发一次完整绘制）
+        """
+        filepath = f"{self._output_prefix}{filename}"
+        save_kwargs = _PNG_SAVE_KWARGS if filename.lower().endswith('.png') else {}
+        plt.savefig(filepath, dpi=300, facecolor='white', **save_kwargs)
         print(f"✅ 图表已保存: {filepath}")
         return filepath
 
+    @_with_chinese_font
     def show_chart(self):
         """显示图表"""
         plt.show()
 
+    def close(self):
+        """关闭复用的Figure，释放画布"""
+        if self._fig is not None:
+            plt.close(self._fig)
+            self._fig = None
+
+    @_with_chinese_font
     def create_bar_chart(self,
                          title: str,
                          categories: List[str],
@@ -171,7 +309,8 @@ class MedicalVisualizer:
                          color: str = "skyblue",
                          show_values: bool = True,
                          rotation: int = 45,
-                         filename: str = None) -> str:
+                         filename: str = None,
+                         fig=None) -> str:
         """
         创建基础柱状图
 
@@ -186,17 +325,16 @@ class MedicalVisualizer:
             show_values: 是否在柱子上显示数值
             rotation: X轴标签旋转角度
             filename: 保存文件名
+            fig: 复用的Figure，为None时复用本实例的Figure
 
         Returns:
             保存的文件路径
         """
-        fig, ax = plt.subplots(figsize=figsize)
-
-        # 设置中文字体
-        self._set_chinese_font(ax)
+        fig, ax = self._subplots(fig, figsize=figsize)
 
         # 创建柱状图
-        bars = ax.bar(categories, values, color=color, edgecolor='black', linewidth=0.5, alpha=0.8)
+        bars = ax.bar(categories, values, color=color, edgecolor='black', linewidth=0.5, alpha=0.8,
+                      rasterized=True)
 
         # 设置标题和标签
         ax.set_title(title, fontsize=16, fontweight='bold', pad=20, fontproperties=self.font_properties)
@@ -205,19 +343,15 @@ class MedicalVisualizer:
 
         # 显示数值 - 修改这里：使用整数格式
         if show_values:
-            for bar in bars:
-                height = bar.get_height()
-                # 修改：使用整数格式，而不是小数格式
-                ax.text(bar.get_x() + bar.get_width() / 2., height + 0.01 * max(values),
-                        f'{int(height)}',  # 使用int()转换为整数
-                        ha='center', va='bottom', fontsize=9,
-                        fontproperties=self.font_properties)
+            # 修改：使用整数格式，而不是小数格式
+            ax.bar_label(bars, fmt='%d', padding=3, fontsize=9, fontproperties=self.font_properties)
 
         # 设置X轴标签旋转
         plt.setp(ax.get_xticklabels(), rotation=rotation, ha='right', fontproperties=self.font_properties)
 
-        # 自动调整Y轴范围
-        ax.set_ylim(0, max(values) * 1.15)
+        # 自动调整Y轴范围（空数据时给出默认范围）
+        vmax = np.max(values) if len(values) else 1.0
+        ax.set_ylim(0, vmax * 1.15)
 
         # 添加网格
         ax.grid(True, axis='y', alpha=0.3)
@@ -226,11 +360,13 @@ class MedicalVisualizer:
             return self.save_chart(filename)
         return ""
 
+    @_with_chinese_font
     def create_grouped_bar_chart(self,
                                  title: str,
                                  data: Dict[str, Dict[str, float]],
                                  figsize: Tuple[int, int] = (14, 7),
-                                 filename: str = None) -> str:
+                                 filename: str = None,
+                                 fig=None) -> str:
         """
         创建分组柱状图
 
@@ -239,37 +375,41 @@ class MedicalVisualizer:
             data: 数据字典 {分组1: {类别1: 值1, ...}, 分组2: {...}, ...}
             figsize: 图表尺寸
             filename: 保存文件名
+            fig: 复用的Figure，为None时复用本实例的Figure
 
         Returns:
             保存的文件路径
         """
-        fig, ax = plt.subplots(figsize=figsize)
-
-        # 设置中文字体
-        self._set_chinese_font(ax)
+        fig, ax = self._subplots(fig, figsize=figsize)
 
         # 提取分组和类别
         groups = list(data.keys())
         categories = list(next(iter(data.values())).keys())
 
-        # 设置柱状图位置
+        # 数值矩阵 (分组数, 类别数)
+        values = np.array([[data[group].get(cat, 0) for cat in categories] for group in groups],
+                          dtype=np.float64)
+
+        # 设置柱状图位置：各分组的偏移一次广播得到 (分组数, 类别数) 的位置矩阵
         x = np.arange(len(categories))
         width = 0.8 / len(groups)  # 柱状图宽度
+        offsets = (np.arange(len(groups)) - (len(groups) - 1) / 2) * width
+        positions = x[None, :] + offsets[:, None]
 
         # 颜色方案
         colors = plt.cm.Set3(np.linspace(0, 1, len(groups)))
 
         # 创建每个分组的柱状图
-        for i, (group_name, group_data) in enumerate(data.items()):
-            values = [group_data.get(cat, 0) for cat in categories]
-            ax.bar(x + i * width - width * (len(groups) - 1) / 2,
-                   values,
+        for i, group_name in enumerate(groups):
+            ax.bar(positions[i],
+                   values[i],
                    width,
                    label=group_name,
                    color=colors[i],
                    edgecolor='black',
                    linewidth=0.5,
-                   alpha=0.8)
+                   alpha=0.8,
+                   rasterized=True)
 
         # 设置图表属性
         ax.set_title(title, fontsize=16, fontweight='bold', pad=20, fontproperties=self.font_properties)
@@ -286,12 +426,14 @@ class MedicalVisualizer:
             return self.save_chart(filename)
         return ""
 
+    @_with_chinese_font
     def create_stacked_bar_chart(self,
                                  title: str,
                                  categories: List[str],
                                  data_layers: Dict[str, List[float]],
                                  figsize: Tuple[int, int] = (14, 7),
-                                 filename: str = None) -> str:
+                                 filename: str = None,
+                                 fig=None) -> str:
         """
         创建堆叠柱状图
 
@@ -301,14 +443,12 @@ class MedicalVisualizer:
             data_layers: 数据层字典 {层名: [值列表], ...}
             figsize: 图表尺寸
             filename: 保存文件名
+            fig: 复用的Figure，为None时复用本实例的Figure
 
         Returns:
             保存的文件路径
         """
-        fig, ax = plt.subplots(figsize=figsize)
-
-        # 设置中文字体
-        self._set_chinese_font(ax)
+        fig, ax = self._subplots(fig, figsize=figsize)
 
         x = np.arange(len(categories))
         width = 0.8
@@ -316,14 +456,16 @@ class MedicalVisualizer:
         # 颜色方案
         colors = plt.cm.Paired(np.linspace(0, 1, len(data_layers)))
 
-        # 创建堆叠柱状图
-        bottom = np.zeros(len(categories))
+        # 创建堆叠柱状图：各层底部为之前各层的累加，用一次 cumsum 得到
+        layer_names = list(data_layers)
+        layers = np.asarray([data_layers[name] for name in layer_names], dtype=np.float64)
+        layers = layers.reshape(len(layer_names), len(categories))
+        bottoms = np.vstack([np.zeros(len(categories)), np.cumsum(layers[:-1], axis=0)])
 
-        for i, (layer_name, values) in enumerate(data_layers.items()):
-            ax.bar(x, values, width, bottom=bottom,
+        for i, layer_name in enumerate(layer_names):
+            ax.bar(x, layers[i], width, bottom=bottoms[i],
                    label=layer_name, color=colors[i],
-                   edgecolor='black', linewidth=0.5, alpha=0.8)
-            bottom += values
+                   edgecolor='black', linewidth=0.5, alpha=0.8, rasterized=True)
 
         # 设置图表属性
         ax.set_title(title, fontsize=16, fontweight='bold', pad=20, fontproperties=self.font_properties)
@@ -340,6 +482,7 @@ class MedicalVisualizer:
             return self.save_chart(filename)
         return ""
 
+    @_with_chinese_font
     def create_horizontal_bar_chart(self,
                                     title: str,
                                     categories: List[str],
@@ -349,7 +492,8 @@ class MedicalVisualizer:
                                     figsize: Tuple[int, int] = (12, 8),
                                     color: str = "lightcoral",
                                     show_values: bool = True,
-                                    filename: str = None) -> str:
+                                    filename: str = None,
+                                    fig=None) -> str:
         """
         创建横向柱状图
 
@@ -363,17 +507,16 @@ class MedicalVisualizer:
             color: 柱状图颜色
             show_values: 是否显示数值
             filename: 保存文件名
+            fig: 复用的Figure，为None时复用本实例的Figure
 
         Returns:
             保存的文件路径
         """
-        fig, ax = plt.subplots(figsize=figsize)
-
-        # 设置中文字体
-        self._set_chinese_font(ax)
+        fig, ax = self._subplots(fig, figsize=figsize)
 
         # 创建横向柱状图
-        bars = ax.barh(categories, values, color=color, edgecolor='black', linewidth=0.5, alpha=0.8)
+        bars = ax.barh(categories, values, color=color, edgecolor='black', linewidth=0.5, alpha=0.8,
+                       rasterized=True)
 
         # 设置标题和标签
         ax.set_title(title, fontsize=16, fontweight='bold', pad=20, fontproperties=self.font_properties)
@@ -382,14 +525,11 @@ class MedicalVisualizer:
 
         # 显示数值
         if show_values:
-            for bar in bars:
-                width = bar.get_width()
-                ax.text(width + 0.01 * max(values), bar.get_y() + bar.get_height() / 2.,
-                        f'{width:.1f}', ha='left', va='center', fontsize=9,
-                        fontproperties=self.font_properties)
+            ax.bar_label(bars, fmt='%.1f', padding=3, fontsize=9, fontproperties=self.font_properties)
 
-        # 自动调整X轴范围
-        ax.set_xlim(0, max(values) * 1.1)
+        # 自动调整X轴范围（空数据时给出默认范围）
+        vmax = np.max(values) if len(values) else 1.0
+        ax.set_xlim(0, vmax * 1.1)
 
         # 添加网格
         ax.grid(True, axis='x', alpha=0.3)
@@ -415,11 +555,13 @@ class MedicalQueryVisualizer(MedicalVisualizer):
             'legend.fontsize': 10
         })
 
+    @_with_chinese_font
     def visualize_doctor_ranking(self,
                                  ranking_data: List[Dict],
                                  title: str = "医生就诊量排名",
                                  top_n: int = 10,
-                                 save: bool = True) -> str:
+                                 save: bool = True,
+                                 fig=None) -> str:
         """
         可视化医生排名
 
@@ -428,6 +570,7 @@ class MedicalQueryVisualizer(MedicalVisualizer):
             title: 图表标题
             top_n: 显示前N名
             save: 是否保存图表
+            fig: 复用的Figure，为None时复用本实例的Figure
 
         Returns:
             图表文件路径
@@ -435,33 +578,27 @@ class MedicalQueryVisualizer(MedicalVisualizer):
         # 提取前N名数据
         top_data = ranking_data[:top_n]
 
-        # 准备数据
-        doctor_names = []
-        for row in top_data:
-            doctor_name = row.get('doctor_name', '未知')
-            dept_name = row.get('dept_name', '未知')
-            # 缩短名称以防止显示问题
-            if len(doctor_name) > 4:
-                doctor_name = doctor_name[:4] + '..'
-            if len(dept_name) > 4:
-                dept_name = dept_name[:4] + '..'
-            doctor_names.append(f"{doctor_name}\n({dept_name})")
-
-        visit_counts = [row.get('visit_count', 0) for row in top_data]
-        revenues = [row.get('total_revenue', 0) for row in top_data]
+        # 准备数据：一次性按列提取
+        columns = rows_to_columns(top_data, ['doctor_name', 'dept_name', 'visit_count', 'total_revenue'],
+                                  text_keys=('doctor_name', 'dept_name'))
+        # 缩短名称以防止显示问题，标签形如 "医生名\n(科室)"
+        doctor_names = np.char.add(
+            np.char.add(_shorten_names(columns['doctor_name'], 4, '未知'), '\n('),
+            np.char.add(_shorten_names(columns['dept_name'], 4, '未知'), ')'))
 
-        # 创建图表
-        fig, ax1 = plt.subplots(figsize=(14, 8))
+        visit_counts = columns['visit_count']
+        revenues = columns['total_revenue']
 
-        # 设置中文字体
-        self._set_chinese_font(ax1)
+        # 创建图表
+        fig, ax1 = self._subplots(fig, figsize=(14, 8))
 
         x = np.arange(len(doctor_names))
         width = 0.35
 
         # 就诊次数柱状图
         bars1 = ax1.bar(x - width / 2, visit_counts, width,
-                        label='就诊次数', color='skyblue', edgecolor='black', alpha=0.8)
+                        label='就诊次数', color='skyblue', edgecolor='black', alpha=0.8,
+                        rasterized=True)
 
         ax1.set_xlabel('医生', fontproperties=self.font_properties)
         ax1.set_ylabel('就诊次数', fontproperties=self.font_properties, color='skyblue')
@@ -470,7 +607,8 @@ class MedicalQueryVisualizer(MedicalVisualizer):
         # 创建第二个Y轴用于收入
         ax2 = ax1.twinx()
         bars2 = ax2.bar(x + width / 2, revenues, width,
-                        label='总收入(元)', color='lightcoral', edgecolor='black', alpha=0.8)
+                        label='总收入(元)', color='lightcoral', edgecolor='black', alpha=0.8,
+                        rasterized=True)
 
         ax2.set_ylabel('总收入(元)', fontproperties=self.font_properties, color='lightcoral')
         ax2.tick_params(axis='y', labelcolor='lightcoral')
@@ -489,59 +627,105 @@ class MedicalQueryVisualizer(MedicalVisualizer):
 
         # 添加数值标签
         for bars, ax in [(bars1, ax1), (bars2, ax2)]:
-            for bar in bars:
-                height = bar.get_height()
-                ax.text(bar.get_x() + bar.get_width() / 2., height + 0.01 * max(height, 1),
-                        f'{height:.0f}', ha='center', va='bottom', fontsize=8,
-                        fontproperties=self.font_properties)
-
-        plt.tight_layout()
+            ax.bar_label(bars, fmt='%.0f', padding=3, fontsize=8, fontproperties=self.font_properties)
 
         if save:
-            filename = f"doctor_ranking_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
+            filename = self._chart_filename("doctor_ranking")
             return self.save_chart(filename)
         return ""
 
     def visualize_department_statistics(self,
                                         dept_stats: List[Dict],
                                         title: str = "科室就诊统计",
-                                        save: bool = True) -> str:
+                                        save: bool = True,
+                                        fig=None) -> str:
         """
-        可视化科室统计
+        可视化科室统计（兼容已聚合的查询结果，按列提取后交给 visualize_department_statistics_arrays）
 
         Args:
             dept_stats: 科室统计数据
             title: 图表总标题
             save: 是否保存图表
+            fig: 复用的Figure，为None时复用本实例的Figure
 
         Returns:
             图表文件路径
         """
-        # 准备数据
-        categories = []
-        for row in dept_stats:
-            dept_name = row.get('dept_name', '未知科室')
-            # 缩短科室名称
-            if len(dept_name) > 6:
-                dept_name = dept_name[:6] + '..'
-            categories.append(dept_name)
+        columns = rows_to_columns(dept_stats, ['dept_name', 'visit_count', 'total_revenue'],
+                                  text_keys=('dept_name',))
+        return self.visualize_department_statistics_arrays(
+            columns['dept_name'],
+            columns['visit_count'],
+            columns['total_revenue'],
+            title=title,
+            save=save,
+            fig=fig
+        )
+
+    def visualize_department_statistics_df(self,
+                                           visits_df,
+                                           title: str = "科室就诊统计",
+                                           save: bool = True,
+                                           fig=None) -> str:
+        """
+        由就诊明细DataFrame可视化科室统计，聚合通过一次 groupby 完成
 
-        visit_counts = [row.get('visit_count', 0) for row in dept_stats]
-        revenues = [row.get('total_revenue', 0) for row in dept_stats]
+        Args:
+            visits_df: 就诊明细（pandas.DataFrame），需含 dept_name、visit_id、total_fee 列
+            title: 图表总标题
+            save: 是否保存图表
+            fig: 复用的Figure，为None时复用本实例的Figure
 
-        # 创建子图
-        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 10))
+        Returns:
+            图表文件路径
+        """
+        stats = (visits_df.groupby('dept_name', sort=False)
+                 .agg(visit_count=('visit_id', 'count'), total_revenue=('total_fee', 'sum'))
+                 .sort_values('total_revenue', ascending=False))
+        return self.visualize_department_statistics_arrays(
+            stats.index.to_numpy(),
+            stats['visit_count'].to_numpy(dtype=np.float64),
+            stats['total_revenue'].to_numpy(dtype=np.float64),
+            title=title,
+            save=save,
+            fig=fig
+        )
+
+    @_with_chinese_font
+    def visualize_department_statistics_arrays(self,
+                                               dept_names,
+                                               visit_counts: np.ndarray,
+                                               revenues: np.ndarray,
+                                               title: str = "科室就诊统计",
+                                               save: bool = True,
+                                               fig=None) -> str:
+        """
+        按列数组可视化科室统计
+
+        Args:
+            dept_names: 科室名称
+            visit_counts: 就诊次数
+            revenues: 总收入
+            title: 图表总标题
+            save: 是否保存图表
+            fig: 复用的Figure，为None时复用本实例的Figure
+
+        Returns:
+            图表文件路径
+        """
+        # 准备数据
+        # 缩短科室名称
+        categories = _shorten_names(dept_names, 6, '未知科室')
 
-        # 设置中文字体
-        self._set_chinese_font(ax1)
-        self._set_chinese_font(ax2)
+        # 创建子图
+        fig, (ax1, ax2) = self._subplots(fig, 2, 1, figsize=(12, 10))
 
         x = np.arange(len(categories))
         width = 0.8
 
         # 就诊次数柱状图
         bars1 = ax1.bar(x, visit_counts, width, color='lightgreen',
-                        edgecolor='black', label='就诊次数', alpha=0.8)
+                        edgecolor='black', label='就诊次数', alpha=0.8, rasterized=True)
         ax1.set_title('各科室就诊次数对比', fontsize=14, fontweight='bold', fontproperties=self.font_properties, pad=10)
         ax1.set_ylabel('就诊次数', fontproperties=self.font_properties)
         ax1.set_xticks(x)
@@ -549,17 +733,13 @@ class MedicalQueryVisualizer(MedicalVisualizer):
         ax1.grid(True, axis='y', alpha=0.3)
 
         # 添加就诊次数数值（整数格式）
-        for bar in bars1:
-            height = bar.get_height()
-            if height > 0:  # 只显示大于0的值
-                ax1.text(bar.get_x() + bar.get_width() / 2., height + 0.01 * max(visit_counts),
-                         f'{int(height)}',  # 整数格式
-                         ha='center', va='bottom', fontsize=9,
-                         fontproperties=self.font_properties)
+        # 只显示大于0的值
+        ax1.bar_label(bars1, labels=[f'{int(v)}' if v > 0 else '' for v in visit_counts],
+                      padding=3, fontsize=9, fontproperties=self.font_properties)
 
         # 收入柱状图
         bars2 = ax2.bar(x, revenues, width, color='gold',
-                        edgecolor='black', label='总收入', alpha=0.8)
+                        edgecolor='black', label='总收入', alpha=0.8, rasterized=True)
         ax2.set_title('各科室收入对比', fontsize=14, fontweight='bold', fontproperties=self.font_properties, pad=10)
         ax2.set_ylabel('收入(元)', fontproperties=self.font_properties)  # 保留"(元)"
         ax2.set_xticks(x)
@@ -567,31 +747,24 @@ class MedicalQueryVisualizer(MedicalVisualizer):
         ax2.grid(True, axis='y', alpha=0.3)
 
         # 修改这里：移除收入数值前的"¥"符号
-        for bar in bars2:
-            height = bar.get_height()
-            if height > 0:  # 只显示大于0的值
-                # 移除¥符号，只显示数字
-                ax2.text(bar.get_x() + bar.get_width() / 2., height + 0.01 * max(revenues),
-                         f'{height:.0f}',  # 修改：移除¥符号
-                         ha='center', va='bottom', fontsize=9,
-                         fontproperties=self.font_properties)
-
-        # 设置总标题
+        # 只显示大于0的值
+        ax2.bar_label(bars2, labels=[f'{v:.0f}' if v > 0 else '' for v in revenues],
+                      padding=3, fontsize=9, fontproperties=self.font_properties)
+
+        # 设置总标题（constrained_layout 自动为其留出空间）
         if title:
-            plt.suptitle(title, fontsize=16, fontweight='bold', y=0.98, fontproperties=self.font_properties)
-            plt.tight_layout(rect=[0, 0, 1, 0.96])  # 调整布局，为总标题留出空间
-        else:
-            plt.tight_layout()
+            plt.suptitle(title, fontsize=16, fontweight='bold', fontproperties=self.font_properties)
 
         if save:
-            filename = f"department_stats_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
+            filename = self._chart_filename("department_stats")
             return self.save_chart(filename)
         return ""
 
     def visualize_monthly_growth(self,
                                  growth_data: List[Dict],
                                  title: str = "月度就诊增长趋势",
-                                 save: bool = True) -> str:
+                                 save: bool = True,
+                                 fig=None) -> str:
         """
         可视化月度增长趋势
 
@@ -599,35 +772,57 @@ class MedicalQueryVisualizer(MedicalVisualizer):
             growth_data: 增长数据
             title: 图表总标题
             save: 是否保存图表
+            fig: 复用的Figure，为None时复用本实例的Figure
 
         Returns:
             图表文件路径
         """
-        # 准备数据
-        months = []
-        for row in growth_data:
-            month = row.get('month', '未知')
-            # 格式化月份显示
-            if '-' in month:
-                year, mon = month.split('-')
-                months.append(f"{year}年{mon}月")
-            else:
-                months.append(month)
-
-        visit_counts = [row.get('visit_count', 0) for row in growth_data]
-        revenues = [row.get('monthly_revenue', 0) for row in growth_data]
-        growth_rates = [row.get('visit_growth_percent', 0) for row in growth_data]
+        columns = rows_to_columns(growth_data, ['month', 'visit_count', 'monthly_revenue',
+                                                'visit_growth_percent'])
+        return self.visualize_monthly_growth_arrays(
+            columns['month'],
+            columns['visit_count'],
+            columns['monthly_revenue'],
+            columns['visit_growth_percent'],
+            title=title,
+            save=save,
+            fig=fig
+        )
+
+    @_with_chinese_font
+    def visualize_monthly_growth_arrays(self,
+                                        months,
+                                        visit_counts: np.ndarray,
+                                        revenues: np.ndarray,
+                                        growth_rates: np.ndarray,
+                                        title: str = "月度就诊增长趋势",
+                                        save: bool = True,
+                                        fig=None) -> str:
+        """
+        按列数组可视化月度增长趋势
 
-        # 创建图表
-        fig, (ax1, ax3) = plt.subplots(2, 1, figsize=(14, 10))
+        Args:
+            months: 月份（'YYYY-MM'）
+            visit_counts: 就诊次数
+            revenues: 月收入
+            growth_rates: 就诊增长率(%)
+            title: 图表总标题
+            save: 是否保存图表
+            fig: 复用的Figure，为None时复用本实例的Figure
+
+        Returns:
+            图表文件路径
+        """
+        # 格式化月份显示
+        months = [f"{month[:4]}年{month[5:]}月" if '-' in month else month
+                  for month in (str(m) for m in months)]
 
-        # 设置中文字体
-        self._set_chinese_font(ax1)
-        self._set_chinese_font(ax3)
+        # 创建图表
+        fig, (ax1, ax3) = self._subplots(fig, 2, 1, figsize=(14, 10))
 
         # 就诊次数柱状图
         bars1 = ax1.bar(months, visit_counts, color='cornflowerblue',
-                        edgecolor='black', alpha=0.7, label='就诊次数')
+                        edgecolor='black', alpha=0.7, label='就诊次数', rasterized=True)
 
         # 修改：移除子图标题，避免与总标题重叠
         # ax1.set_title('月度就诊次数', fontsize=14, fontweight='bold', fontproperties=self.font_properties)
@@ -636,12 +831,9 @@ class MedicalQueryVisualizer(MedicalVisualizer):
         ax1.grid(True, axis='y', alpha=0.3)
 
         # 添加就诊次数数值
-        for bar in bars1:
-            height = bar.get_height()
-            if height > 0:  # 只显示大于0的值
-                ax1.text(bar.get_x() + bar.get_width() / 2., height + 0.01 * max(visit_counts),
-                         f'{height:.0f}', ha='center', va='bottom', fontsize=9,
-                         fontproperties=self.font_properties)
+        # 只显示大于0的值
+        ax1.bar_label(bars1, labels=[f'{v:.0f}' if v > 0 else '' for v in visit_counts],
+                      padding=3, fontsize=9, fontproperties=self.font_properties)
 
         # 创建第二个Y轴用于增长率
         ax2 = ax1.twinx()
@@ -658,7 +850,7 @@ class MedicalQueryVisualizer(MedicalVisualizer):
 
         # 收入柱状图
         bars2 = ax3.bar(months, revenues, color='salmon',
-                        edgecolor='black', alpha=0.7, label='收入')
+                        edgecolor='black', alpha=0.7, label='收入', rasterized=True)
 
         # 修改：移除子图标题，避免与总标题重叠
         # ax3.set_title('月度收入', fontsize=14, fontweight='bold', fontproperties=self.font_properties)
@@ -667,31 +859,25 @@ class MedicalQueryVisualizer(MedicalVisualizer):
         ax3.grid(True, axis='y', alpha=0.3)
 
         # 修改：移除收入数值前的"¥"符号
-        for bar in bars2:
-            height = bar.get_height()
-            if height > 0:  # 只显示大于0的值
-                # 修改这里：移除¥符号
-                ax3.text(bar.get_x() + bar.get_width() / 2., height + 0.01 * max(revenues),
-                         f'{height:.0f}', ha='center', va='bottom', fontsize=9,
-                         fontproperties=self.font_properties)
-
-        # 设置总标题
+        # 只显示大于0的值
+        ax3.bar_label(bars2, labels=[f'{v:.0f}' if v > 0 else '' for v in revenues],
+                      padding=3, fontsize=9, fontproperties=self.font_properties)
+
+        # 设置总标题（constrained_layout 自动为其留出空间，避免与子图重叠）
         if title:
-            # 调整总标题位置，避免与子图标题重叠
-            plt.suptitle(title, fontsize=16, fontweight='bold', y=0.95, fontproperties=self.font_properties)
-            plt.tight_layout(rect=[0, 0, 1, 0.95])  # 调整布局，为总标题留出空间
-        else:
-            plt.tight_layout()
+            plt.suptitle(title, fontsize=16, fontweight='bold', fontproperties=self.font_properties)
 
         if save:
-            filename = f"monthly_growth_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
+            filename = self._chart_filename("monthly_growth")
             return self.save_chart(filename)
         return ""
 
+    @_with_chinese_font
     def visualize_patient_demographics(self,
                                        patient_data: List[Dict],
                                        title: str = "患者人口统计",
-                                       save: bool = True) -> str:
+                                       save: bool = True,
+                                       fig=None) -> str:
         """
         可视化患者人口统计数据
 
@@ -699,62 +885,52 @@ class MedicalQueryVisualizer(MedicalVisualizer):
             patient_data: 患者数据
             title: 图表标题
             save: 是否保存图表
+            fig: 复用的Figure，为None时复用本实例的Figure
 
         Returns:
             图表文件路径
         """
+        # 一次性按列提取
+        columns = rows_to_columns(patient_data, ['gender', 'blood_type', 'age', 'visit_count'],
+                                  text_keys=('gender', 'blood_type'))
+
         # 创建子图
-        fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(15, 12))
-
-        # 设置中文字体
-        for ax in [ax1, ax2, ax3, ax4]:
-            self._set_chinese_font(ax)
-
-        # 1. 性别分布
-        gender_data = {}
-        for row in patient_data:
-            gender = row.get('gender', '未知')
-            if gender == 'M':
-                gender_label = '男'
-            elif gender == 'F':
-                gender_label = '女'
-            else:
-                gender_label = '未知'
-            gender_data[gender_label] = gender_data.get(gender_label, 0) + 1
-
-        gender_labels = list(gender_data.keys())
-        gender_values = list(gender_data.values())
-
-        colors1 = ['lightblue', 'lightpink', 'lightgray']
+        fig, ((ax1, ax2), (ax3, ax4)) = self._subplots(fig, 2, 2, figsize=(15, 12))
+
+        # 1. 性别分布（np.unique 一次完成计数）
+        genders = columns['gender']
+        genders = np.where(genders == 'M', '男', np.where(genders == 'F', '女', '未知'))
+        gender_labels, gender_values = np.unique(genders, return_counts=True)
+
+        gender_colors = {'男': 'lightblue', '女': 'lightpink', '未知': 'lightgray'}
         wedges, texts, autotexts = ax1.pie(gender_values, labels=gender_labels,
                                            autopct='%1.1f%%', startangle=90,
-                                           colors=colors1[:len(gender_values)])
+                                           colors=[gender_colors[label] for label in gender_labels],
+                                           wedgeprops={'rasterized': True})
 
         # 设置饼图文本字体
-        for text in texts + autotexts:
-            text.set_fontproperties(self.font_properties)
+        plt.setp(texts + autotexts, fontproperties=self.font_properties)
 
         ax1.set_title('性别分布', fontsize=14, fontweight='bold', fontproperties=self.font_properties)
 
         # 2. 血型分布
-        blood_data = {}
-        for row in patient_data:
-            blood = row.get('blood_type', '未知')
-            blood_data[blood] = blood_data.get(blood, 0) + 1
-
-        blood_types = list(blood_data.keys())
-        blood_counts = list(blood_data.values())
+        blood = columns['blood_type'].copy()
+        blood[np.equal(blood, None)] = '未知'
+        blood_types, blood_counts = np.unique(blood, return_counts=True)
 
-        bars = ax2.bar(blood_types, blood_counts, color='lightcoral', edgecolor='black', alpha=0.8)
+        bars = ax2.bar(blood_types, blood_counts, color='lightcoral', edgecolor='black', alpha=0.8,
+                       rasterized=True)
         ax2.set_title('血型分布', fontsize=14, fontweight='bold', fontproperties=self.font_properties)
         ax2.set_xlabel('血型', fontproperties=self.font_properties)
         ax2.set_ylabel('人数', fontproperties=self.font_properties)
         ax2.grid(True, axis='y', alpha=0.3)
 
         # 3. 年龄分布
-        ages = [row.get('age', 0) for row in patient_data if row.get('age')]
-        if ages:
-            ax3.hist(ages, bins=20, color='lightgreen', edgecolor='black', alpha=0.7)
+        ages = columns['age']
+        ages = ages[ages > 0]
+        if len(ages):
+            ax3.hist(ages, bins=20, color='lightgreen', edgecolor='black', alpha=0.7,
+                     rasterized=True)
             ax3.set_title('年龄分布', fontsize=14, fontweight='bold', fontproperties=self.font_properties)
             ax3.set_xlabel('年龄', fontproperties=self.font_properties)
             ax3.set_ylabel('人数', fontproperties=self.font_properties)
@@ -765,19 +941,18 @@ class MedicalQueryVisualizer(MedicalVisualizer):
             ax3.set_title('年龄分布', fontsize=14, fontweight='bold', fontproperties=self.font_properties)
 
         # 4. 就诊次数分布
-        visit_counts = [row.get('visit_count', 0) for row in patient_data]
-        unique, counts = np.unique(visit_counts, return_counts=True)
+        unique, counts = np.unique(columns['visit_count'], return_counts=True)
 
-        bars4 = ax4.bar(unique[:10], counts[:10], color='gold', edgecolor='black', alpha=0.8)
+        bars4 = ax4.bar(unique[:10], counts[:10], color='gold', edgecolor='black', alpha=0.8,
+                        rasterized=True)
         ax4.set_title('就诊次数分布(前10)', fontsize=14, fontweight='bold', fontproperties=self.font_properties)
         ax4.set_xlabel('就诊次数', fontproperties=self.font_properties)
         ax4.set_ylabel('患者人数', fontproperties=self.font_properties)
         ax4.grid(True, axis='y', alpha=0.3)
 
-        plt.suptitle(title, fontsize=16, fontweight='bold', y=0.95, fontproperties=self.font_properties)
-        plt.tight_layout()
+        plt.suptitle(title, fontsize=16, fontweight='bold', fontproperties=self.font_properties)
 
         if save:
-            filename = f"patient_demographics_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
+            filename = self._chart_filename("patient_demographics")
             return self.save_chart(filename)
         return ""
\ No newline at end of file